@@ -0,0 +1,130 @@
+import argparse
+import io
+import json
+import tempfile
+from contextlib import redirect_stdout
+from copy import deepcopy
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+
+from aoc.days import DayModule, discover_days, load_day
+from aoc.generators import GENERATORS
+
+
+class BenchResult(NamedTuple):
+    day: int
+    n: int
+    n_bytes: int
+    load: float
+    part1: float
+    part2: float
+
+    def total(self) -> float:
+        return self.load + self.part1 + self.part2
+
+
+def best_of(f, n_repeat: int) -> float:
+    times = []
+    for _ in range(n_repeat):
+        start = perf_counter()
+        f()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def bench_input(day_module: DayModule, fpath: Path, n_repeat: int) -> tuple:
+    with redirect_stdout(io.StringIO()):
+        t_load = best_of(lambda: day_module.load_inputs(fpath), n_repeat)
+        inputs = day_module.load_inputs(fpath)
+
+        # Solvers may consume their inputs, so every repeat gets a fresh copy
+        (t_pt1, t_pt2) = (float("inf"), float("inf"))
+        for _ in range(n_repeat):
+            inputs1 = deepcopy(inputs)
+            start = perf_counter()
+            answer1 = day_module.solve_pt1(*inputs1)
+            t_pt1 = min(t_pt1, perf_counter() - start)
+
+            (_, inputs2) = day_module.split_answer(answer1, deepcopy(inputs))
+            start = perf_counter()
+            day_module.solve_pt2(*inputs2)
+            t_pt2 = min(t_pt2, perf_counter() - start)
+    return (t_load, t_pt1, t_pt2)
+
+
+def bench_day(day: int, sizes: Optional[List[int]] = None, n_repeat: int = 3,
+              max_seconds: float = 10.0, seed: int = 2021) -> List[BenchResult]:
+    generator = GENERATORS[day]
+    day_module = load_day(discover_days()[day])
+    rng = np.random.default_rng(seed)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in (sizes or generator.sizes):
+            fpath = Path(tmpdir) / f"day{day}-{n}.dat"
+            fpath.write_text(generator.generate(n, rng))
+            timings = bench_input(day_module, fpath, n_repeat)
+            results.append(BenchResult(day, n, fpath.stat().st_size, *timings))
+            fpath.unlink()
+
+            # Larger sizes would only take longer
+            if results[-1].total() > max_seconds:
+                break
+    return results
+
+
+def scaling_exponent(results: List[BenchResult], part: str) -> Optional[float]:
+    # Slope of log(time) against log(input size); timings under a millisecond
+    # are mostly overhead, so leave them out of the fit
+    points = [(r.n_bytes, getattr(r, part)) for r in results if getattr(r, part) > 1.0e-03]
+    if len(points) < 2:
+        return None
+    (x, y) = np.log(np.array(points)).T
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def print_report(day: int, results: List[BenchResult]) -> None:
+    print(f"\nDay {day} (n = {GENERATORS[day].scale})")
+    print(f"{'n':>10} {'bytes':>12} {'load [s]':>10} {'part1 [s]':>10} {'part2 [s]':>10}")
+    for r in results:
+        print(f"{r.n:>10} {r.n_bytes:>12} {r.load:>10.4f} {r.part1:>10.4f} {r.part2:>10.4f}")
+
+    exponents = []
+    for part in ("load", "part1", "part2"):
+        k = scaling_exponent(results, part)
+        exponents.append(f"{part} ~ O(bytes^{k:.2f})" if k is not None else f"{part} ~ n/a")
+    print("Scaling: " + ", ".join(exponents))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark solutions on synthetic inputs")
+    parser.add_argument("-d", "--days", type=int, nargs="+", default=sorted(GENERATORS),
+                        help="days to benchmark (default: every day with a generator)")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=None,
+                        help="scale parameters to sweep (default: per-day sweep)")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="repeats per size; the best time is kept")
+    parser.add_argument("-t", "--max-seconds", type=float, default=10.0,
+                        help="stop a day's sweep once one size takes longer than this")
+    parser.add_argument("--seed", type=int, default=2021)
+    parser.add_argument("--json", type=Path, default=None,
+                        help="write the timings to this JSON file")
+    args = parser.parse_args()
+
+    all_results: Dict[int, List[BenchResult]] = {}
+    for day in args.days:
+        if day not in GENERATORS:
+            raise ValueError(f"ERROR: No input generator for day {day}")
+        all_results[day] = bench_day(day, args.sizes, args.repeat, args.max_seconds, args.seed)
+        print_report(day, all_results[day])
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump([r._asdict() for rs in all_results.values() for r in rs], f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+import importlib.util
+import inspect
+import re
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DAY_DIR_PATTERN = re.compile(r"^day-(\d+)$")
+
+
+class Day(NamedTuple):
+    number: int
+    directory: Path
+    script: Path
+
+    def inputs(self, patterns: List[str] = ("*.dat",)) -> List[Path]:
+        fpaths = set()
+        for pattern in patterns:
+            fpaths |= set(self.directory.glob(pattern))
+        return sorted(fpaths)
+
+
+class DayModule(NamedTuple):
+    day: Day
+    module: ModuleType
+    load: Callable
+    solve_pt1: Callable
+    solve_pt2: Callable
+
+    def n_args(self) -> int:
+        return len(inspect.signature(self.solve_pt1).parameters)
+
+    def load_inputs(self, fpath: Path) -> tuple:
+        inputs = self.load(fpath)
+        # Loaders for multi-argument solvers return all the arguments at once
+        if self.n_args() > 1:
+            return tuple(inputs)
+        return (inputs,)
+
+    def split_answer(self, answer1: Any, inputs: tuple) -> Tuple[Any, tuple]:
+        # Solvers that return '(answer, state)' from part 1 expect 'state' in
+        # part 2; every other part 2 takes the same inputs as part 1
+        if isinstance(answer1, tuple):
+            (answer1, state) = answer1
+            return (answer1, (state,))
+        return (answer1, inputs)
+
+
+def discover_days(root: Path = ROOT_DIR) -> Dict[int, Day]:
+    days = {}
+    for directory in root.iterdir():
+        match = DAY_DIR_PATTERN.match(directory.name)
+        if (match is None) or (not directory.is_dir()):
+            continue
+        for script in sorted(directory.glob("*.py")):
+            if "def solve_pt1" in script.read_text():
+                number = int(match.group(1))
+                days[number] = Day(number, directory, script)
+                break
+    return dict(sorted(days.items()))
+
+
+def load_day(day: Day) -> DayModule:
+    # Day scripts import their own helpers as siblings and the shared 'aoc'
+    # package from the repository root
+    for path in (str(day.directory), str(ROOT_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    module_name = f"day{day.number}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, day.script)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+    loaders = [
+        obj for (name, obj) in vars(module).items()
+        if name.startswith("load") and callable(obj)
+        and getattr(obj, "__module__", None) == module_name
+    ]
+    assert len(loaders) == 1, f"Day {day.number} needs exactly one load_* function"
+    return DayModule(day, module, loaders[0], module.solve_pt1, module.solve_pt2)
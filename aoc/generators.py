@@ -0,0 +1,198 @@
+from itertools import permutations, product
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
+
+
+class Generator(NamedTuple):
+    generate: Callable[[int, np.random.Generator], str]
+    # What the scale parameter 'n' controls
+    scale: str
+    sizes: List[int]
+
+
+def digit_grid(shape: tuple, rng: np.random.Generator, low: int = 0) -> str:
+    grid = rng.integers(low, 10, size=shape, dtype=np.uint8) + ord("0")
+    lines = np.concatenate([grid, np.full((shape[0], 1), ord("\n"), np.uint8)], axis=1)
+    return lines.tobytes().decode()
+
+
+def gen_day1(n: int, rng: np.random.Generator) -> str:
+    depths = 100 + np.cumsum(rng.integers(-10, 20, size=n))
+    return "\n".join(map(str, depths.tolist())) + "\n"
+
+
+def gen_day2(n: int, rng: np.random.Generator) -> str:
+    names = np.array(["forward", "down", "up"])
+    commands = names[rng.choice(3, size=n, p=(0.5, 0.3, 0.2))]
+    sizes = rng.integers(1, 10, size=n)
+    return "".join(f"{c} {s}\n" for (c, s) in zip(commands, sizes.tolist()))
+
+
+def gen_day3(n: int, rng: np.random.Generator) -> str:
+    # Both rating searches only finish on a single code if every group of
+    # codes sharing a prefix is split by the next bit, so build the report
+    # as the leaves of a full binary trie
+    def leaves(prefix: str, n_leaf: int) -> List[str]:
+        if n_leaf == 1:
+            return [prefix]
+        k = int(rng.binomial(n_leaf - 2, 0.5)) + 1
+        return leaves(prefix + "0", k) + leaves(prefix + "1", n_leaf - k)
+
+    prefixes = leaves("", max(n, 2))
+    bitwidth = max(12, max(map(len, prefixes)))
+    codes = [p + "".join(rng.choice(("0", "1"), size=bitwidth - len(p))) for p in prefixes]
+    rng.shuffle(codes)
+    return "\n".join(codes) + "\n"
+
+
+def gen_day4(n: int, rng: np.random.Generator) -> str:
+    # Every number gets drawn, so every board wins eventually
+    draws = rng.permutation(100)
+    lines = [",".join(map(str, draws.tolist()))]
+    for _ in range(n):
+        board = rng.choice(100, size=(5, 5), replace=False)
+        lines.append("")
+        lines += [" ".join(f"{v:2d}" for v in row) for row in board.tolist()]
+    return "\n".join(lines) + "\n"
+
+
+def gen_day7(n: int, rng: np.random.Generator) -> str:
+    positions = rng.integers(0, 2000, size=n)
+    return ",".join(map(str, positions.tolist()))
+
+
+def gen_day9(n: int, rng: np.random.Generator) -> str:
+    return digit_grid((n, n), rng)
+
+
+def gen_day10(n: int, rng: np.random.Generator) -> str:
+    (opening, closing) = ("([{<", ")]}>")
+    lines = []
+    for _ in range(n):
+        (line, stack) = ([], [])
+        for _ in range(rng.integers(10, 100)):
+            if stack and (rng.random() < 0.4):
+                line.append(closing[stack.pop()])
+            else:
+                stack.append(rng.integers(4))
+                line.append(opening[stack[-1]])
+        # Incomplete lines must still have something left to close
+        if not stack:
+            stack.append(0)
+            line.append(opening[0])
+        if rng.random() < 0.5:
+            line.append(closing[(stack[-1] + 1) % 4])
+        lines.append("".join(line))
+    return "\n".join(lines) + "\n"
+
+
+def gen_day13(n: int, rng: np.random.Generator) -> str:
+    # Unfold a 40x6 sheet, alternating axes, until there is room for 'n' dots
+    (width, height, folds) = (40, 6, [])
+    while width * height < 4 * n:
+        if width <= 6 * height:
+            folds.append(f"fold along x={width}")
+            width = 2 * width + 1
+        else:
+            folds.append(f"fold along y={height}")
+            height = 2 * height + 1
+    folds.reverse()
+
+    xs = rng.integers(0, width, size=n)
+    ys = rng.integers(0, height, size=n)
+    # Dots never land on a fold line
+    on_fold = np.zeros(n, dtype=bool)
+    for fold in folds:
+        (axis, pos) = fold.split(" ")[2].split("=")
+        on_fold |= ((xs if axis == "x" else ys) == int(pos))
+    dots = "\n".join(f"{x},{y}" for (x, y) in zip(xs[~on_fold].tolist(), ys[~on_fold].tolist()))
+    return dots + "\n\n" + "\n".join(folds) + "\n"
+
+
+def gen_day15(n: int, rng: np.random.Generator) -> str:
+    return digit_grid((n, n), rng, low=1)
+
+
+def gen_day16(n: int, rng: np.random.Generator) -> str:
+    def header(type_id: int) -> str:
+        return f"{rng.integers(8):03b}{type_id:03b}"
+
+    def literal() -> str:
+        value = f"{rng.integers(1, 2 ** 16):016b}"
+        groups = [value[i:i + 4] for i in range(0, 16, 4)]
+        return header(4) + "".join("1" + g for g in groups[:-1]) + "0" + groups[-1]
+
+    def operator(type_id: int, children: List[str]) -> str:
+        return header(type_id) + "1" + f"{len(children):011b}" + "".join(children)
+
+    # Nest 'n' operators, each holding a literal and the next level down
+    packet = literal()
+    for _ in range(n):
+        type_id = int(rng.choice((0, 1, 2, 3, 5, 6, 7), p=(0.4, 0.05, 0.15, 0.15, 0.1, 0.1, 0.05)))
+        packet = operator(type_id, [packet, literal()])
+    packet += "0" * (-len(packet) % 4)
+    return "".join(f"{int(packet[i:i + 4], 2):X}" for i in range(0, len(packet), 4))
+
+
+def rotations() -> List[np.ndarray]:
+    matrices = []
+    for perm in permutations(range(3)):
+        for signs in product((-1, 1), repeat=3):
+            matrix = np.zeros((3, 3), dtype=int)
+            matrix[range(3), perm] = signs
+            if round(np.linalg.det(matrix)) == 1:
+                matrices.append(matrix)
+    return matrices
+
+
+def gen_day19(n: int, rng: np.random.Generator) -> str:
+    # Scanners sit on a random walk; each step is short enough that
+    # neighbouring scanners share a region seeded with 12 beacons
+    positions = [np.zeros(3, dtype=int)]
+    for _ in range(n - 1):
+        step = rng.integers(-100, 101, size=3)
+        step[rng.integers(3)] = rng.choice((-1, 1)) * rng.integers(1000, 1200)
+        positions.append(positions[-1] + step)
+    positions = np.array(positions)
+
+    beacons = [p + rng.integers(-1000, 1001, size=(12, 3)) for p in positions]
+    for (a, b) in zip(positions[:-1], positions[1:]):
+        (low, high) = (np.maximum(a, b) - 1000, np.minimum(a, b) + 1000)
+        beacons.append(rng.integers(low, high + 1, size=(12, 3)))
+    beacons = np.unique(np.concatenate(beacons), axis=0)
+
+    all_rotations = rotations()
+    lines = []
+    for (index, position) in enumerate(positions):
+        relative = beacons - position
+        relative = relative[np.all(np.abs(relative) <= 1000, axis=1)]
+        relative = relative @ all_rotations[rng.integers(24)].T
+        lines.append(f"--- scanner {index} ---")
+        lines += [",".join(map(str, p)) for p in relative.tolist()]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def gen_day25(n: int, rng: np.random.Generator) -> str:
+    grid = rng.choice(np.array(list(".>v")), size=(n, n), p=(0.5, 0.25, 0.25))
+    # A jammed row of '>' and column of 'v' stop anything wrapping around, so
+    # the herds always reach gridlock
+    grid[0, :] = ">"
+    grid[:, 0] = "v"
+    return "\n".join("".join(row) for row in grid) + "\n"
+
+
+GENERATORS: Dict[int, Generator] = {
+    1: Generator(gen_day1, "depth readings", [10 ** k for k in range(3, 8)]),
+    2: Generator(gen_day2, "commands", [10 ** k for k in range(3, 7)]),
+    3: Generator(gen_day3, "report rows", [10 ** k for k in range(2, 6)]),
+    4: Generator(gen_day4, "bingo boards", [10 ** k for k in range(1, 5)]),
+    7: Generator(gen_day7, "crabs", [10 ** k for k in range(1, 5)]),
+    9: Generator(gen_day9, "grid side", [10, 50, 100, 200, 400]),
+    10: Generator(gen_day10, "lines", [10 ** k for k in range(2, 6)]),
+    13: Generator(gen_day13, "dots", [10 ** k for k in range(2, 6)]),
+    15: Generator(gen_day15, "cavern side", [10, 50, 100, 250, 500, 1000, 2000]),
+    16: Generator(gen_day16, "nesting depth", [10, 50, 100, 200, 400]),
+    19: Generator(gen_day19, "scanners", [2, 4, 8, 16, 32, 64, 128, 256]),
+    25: Generator(gen_day25, "grid side", [10, 50, 100, 250, 500, 1000, 2000]),
+}
@@ -0,0 +1,201 @@
+import atexit
+import cProfile
+import csv
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+
+# Instrumentation is off unless switched on with 'enable' or through the
+# environment, e.g. 'AOC_INSTRUMENT=1 AOC_METRICS=metrics.csv python solve.py'
+ENV_ENABLE = "AOC_INSTRUMENT"
+ENV_PROFILE_DIR = "AOC_PROFILE"
+ENV_METRICS_PATH = "AOC_METRICS"
+
+
+class Measurement(NamedTuple):
+    name: str
+    wall: float
+    cpu: float
+    # Peak traced memory above what was allocated on entry [bytes]
+    peak_memory: Optional[int]
+
+
+class _Frame:
+    def __init__(self, current_memory: int):
+        self.current_memory = current_memory
+        self.peak_memory = current_memory
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.track_memory = False
+        self.profile_dir: Optional[Path] = None
+        self.measurements: List[Measurement] = []
+        self.counters: Counter = Counter()
+        self.stack: List[_Frame] = []
+        self.depth = 0
+        self.n_profile = 0
+
+
+_state = _State()
+
+
+def enable(track_memory: bool = True, profile_dir: Optional[str] = None) -> None:
+    _state.enabled = True
+    _state.track_memory = track_memory
+    _state.profile_dir = None if profile_dir is None else Path(profile_dir)
+    if _state.profile_dir is not None:
+        _state.profile_dir.mkdir(parents=True, exist_ok=True)
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    _state.enabled = False
+    if _state.track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.track_memory = False
+    _state.profile_dir = None
+
+
+def enabled() -> bool:
+    return _state.enabled
+
+
+def reset() -> None:
+    _state.measurements = []
+    _state.counters = Counter()
+    _state.stack = []
+    _state.depth = 0
+
+
+def count(name: str, n: int = 1) -> None:
+    if _state.enabled:
+        _state.counters[name] += n
+
+
+def _enter_memory_frame() -> _Frame:
+    (current, peak) = tracemalloc.get_traced_memory()
+    # Nested frames reset the peak, so hand the peak so far to the parent
+    if _state.stack:
+        parent = _state.stack[-1]
+        parent.peak_memory = max(parent.peak_memory, peak)
+    tracemalloc.reset_peak()
+    frame = _Frame(current)
+    _state.stack.append(frame)
+    return frame
+
+
+def _exit_memory_frame(frame: _Frame) -> int:
+    (_, peak) = tracemalloc.get_traced_memory()
+    _state.stack.pop()
+    peak = max(peak, frame.peak_memory)
+    if _state.stack:
+        parent = _state.stack[-1]
+        parent.peak_memory = max(parent.peak_memory, peak)
+    return peak - frame.current_memory
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    if not _state.enabled:
+        yield
+        return
+
+    frame = _enter_memory_frame() if _state.track_memory else None
+
+    # Only one profiler can be active at a time, so nested measurements are
+    # covered by the outermost profile
+    profiler = None
+    if (_state.profile_dir is not None) and (_state.depth == 0):
+        profiler = cProfile.Profile()
+    _state.depth += 1
+
+    (wall_start, cpu_start) = (time.perf_counter(), time.process_time())
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _state.depth -= 1
+        (wall, cpu) = (time.perf_counter() - wall_start, time.process_time() - cpu_start)
+        peak_memory = _exit_memory_frame(frame) if frame is not None else None
+        _state.measurements.append(Measurement(name, wall, cpu, peak_memory))
+
+        if profiler is not None:
+            _state.n_profile += 1
+            fname = f"{name}-{os.getpid()}-{_state.n_profile}.prof"
+            profiler.dump_stats(str(_state.profile_dir / fname))
+
+
+def timing(f: Callable) -> Callable:
+    @wraps(f)
+    def wrap(*args, **kw):
+        with measure(f.__name__):
+            return f(*args, **kw)
+    return wrap
+
+
+def measurements() -> List[Measurement]:
+    return list(_state.measurements)
+
+
+def counters() -> Dict[str, int]:
+    return dict(_state.counters)
+
+
+def snapshot() -> dict:
+    return {
+        "measurements": [m._asdict() for m in _state.measurements],
+        "counters": counters(),
+    }
+
+
+def write_csv(fpath: str, rows: List[dict]) -> None:
+    fieldnames = []
+    for row in rows:
+        fieldnames += [k for k in row if k not in fieldnames]
+    with open(fpath, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def snapshot_rows(metrics: dict, **extra) -> List[dict]:
+    rows = []
+    for m in metrics["measurements"]:
+        rows.append({**extra, "kind": "measurement", **m})
+    for (name, value) in metrics["counters"].items():
+        rows.append({**extra, "kind": "counter", "name": name, "value": value})
+    return rows
+
+
+def export(fpath: str) -> None:
+    fpath = Path(fpath)
+    if fpath.suffix == ".csv":
+        write_csv(fpath, snapshot_rows(snapshot()))
+    else:
+        with open(fpath, "w") as f:
+            json.dump(snapshot(), f, indent=2)
+
+
+def _configure_from_env() -> None:
+    if os.environ.get(ENV_ENABLE, "0") in ("", "0"):
+        return
+    enable(profile_dir=os.environ.get(ENV_PROFILE_DIR))
+    metrics_path = os.environ.get(ENV_METRICS_PATH)
+    if metrics_path:
+        atexit.register(export, metrics_path)
+
+
+_configure_from_env()
@@ -0,0 +1,131 @@
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+ZERO = ord("0")
+
+
+def _grid_view(raw: np.ndarray) -> np.ndarray:
+    # Drop trailing line endings so every row is followed by the same gap
+    end = len(raw)
+    while (end > 0) and (raw[end - 1] in (NEWLINE, CARRIAGE_RETURN)):
+        end -= 1
+    raw = raw[:end]
+
+    # Find the first line ending without touching the rest of the buffer
+    chunk = 4096
+    n_col = bytes(raw[:chunk]).find(b"\n")
+    while (n_col < 0) and (chunk < len(raw)):
+        chunk *= 2
+        n_col = bytes(raw[:chunk]).find(b"\n")
+    if n_col < 0:
+        n_col = len(raw)
+
+    stride = n_col + 1
+    if (n_col > 0) and (raw[n_col - 1] == CARRIAGE_RETURN):
+        n_col -= 1
+
+    n_row = (len(raw) + stride - n_col) // stride
+    if n_row * stride - (stride - n_col) != len(raw):
+        raise ValueError("ERROR: Digit grid has ragged rows")
+    if (n_row > 1) and np.any(raw[stride - 1:(n_row - 1) * stride:stride] != NEWLINE):
+        raise ValueError("ERROR: Digit grid has ragged rows")
+    return np.lib.stride_tricks.as_strided(
+        raw, shape=(n_row, n_col), strides=(stride, 1), writeable=False)
+
+
+def map_digit_grid(fpath: str) -> np.ndarray:
+    # Zero-copy (n_row, n_col) view of the ASCII codes in a file of digit
+    # rows; subtract 'ZERO' from a slice of it to get the digits themselves
+    raw = np.memmap(fpath, dtype=np.uint8, mode="r")
+    return _grid_view(raw)
+
+
+def load_digit_grid(fpath: str, memory_map: bool = False) -> np.ndarray:
+    if memory_map:
+        ascii_grid = map_digit_grid(fpath)
+    else:
+        raw = np.frombuffer(Path(fpath).read_bytes(), dtype=np.uint8)
+        ascii_grid = _grid_view(raw)
+    grid = ascii_grid - np.uint8(ZERO)
+    if np.any(grid > 9):
+        raise ValueError(f"ERROR: Non-digit character in grid file {fpath}")
+    return grid
+
+
+MINUS = ord("-")
+CHUNK_SIZE = 1 << 22
+# Commas become spaces so that NumPy's text parser, which treats any run of
+# whitespace as one separator, reads comma- and newline-separated numbers alike
+SEPARATORS_TO_SPACES = bytes.maketrans(b",", b" ")
+
+
+def _is_digit(raw: np.ndarray) -> np.ndarray:
+    return (raw >= ZERO) & (raw <= ZERO + 9)
+
+
+def _chunk_bounds(raw: np.ndarray, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    # Byte ranges of roughly 'chunk_size' that never split a number
+    (start, size) = (0, len(raw))
+    while start < size:
+        end = min(start + chunk_size, size)
+        while (end < size) and (_is_digit(raw[end]) or (raw[end] == MINUS)):
+            end += 1
+        yield (start, end)
+        start = end
+
+
+def count_ints(chunk: np.ndarray) -> int:
+    if len(chunk) == 0:
+        return 0
+    # Count the digits that start a number
+    is_digit = _is_digit(chunk)
+    return int(is_digit[0]) + int(np.count_nonzero(is_digit[1:] & ~is_digit[:-1]))
+
+
+def parse_ints(chunk: np.ndarray, ignore: bytes = b"") -> np.ndarray:
+    # Characters in 'ignore' (e.g. the words around the numbers) are dropped
+    text = bytes(chunk).translate(SEPARATORS_TO_SPACES, ignore).decode("ascii").strip()
+    if not text:
+        return np.zeros((0,), dtype=np.int64)
+    return np.fromstring(text, dtype=np.int64, sep=" ")
+
+
+def map_bytes(fpath: str) -> np.ndarray:
+    if Path(fpath).stat().st_size == 0:
+        return np.zeros((0,), dtype=np.uint8)
+    return np.memmap(fpath, dtype=np.uint8, mode="r")
+
+
+def iter_ints(fpath: str, chunk_size: int = CHUNK_SIZE,
+              dtype: type = np.int64) -> Iterator[np.ndarray]:
+    # Streams the integers in a file of comma/newline separated numbers one
+    # chunk at a time; memory use depends on 'chunk_size', not the file size
+    raw = map_bytes(fpath)
+    for (start, end) in _chunk_bounds(raw, chunk_size):
+        values = parse_ints(raw[start:end])
+        if len(values) > 0:
+            yield values.astype(dtype, copy=False)
+
+
+def load_ints(fpath: str, chunk_size: int = CHUNK_SIZE, dtype: type = np.int64,
+              byte_range: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    raw = map_bytes(fpath)
+    if byte_range is not None:
+        raw = raw[byte_range[0]:byte_range[1]]
+    bounds = list(_chunk_bounds(raw, chunk_size))
+
+    # Count first so the result is allocated exactly once
+    counts = [count_ints(raw[start:end]) for (start, end) in bounds]
+    values = np.empty((sum(counts),), dtype=dtype)
+    offset = 0
+    for ((start, end), n_value) in zip(bounds, counts):
+        chunk_values = parse_ints(raw[start:end])
+        if len(chunk_values) != n_value:
+            raise ValueError(f"ERROR: Malformed integer list in {fpath}")
+        values[offset:offset + n_value] = chunk_values
+        offset += n_value
+    return values
@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+
+CHUNK_SIZE = 1 << 26
+
+
+def byte_ranges(fpath: str, chunk_size: int = CHUNK_SIZE,
+                min_chunks: int = 1) -> List[Tuple[int, int]]:
+    # Split a file into contiguous byte ranges of about 'chunk_size' (but at
+    # least 'min_chunks' of them) that each end just after a newline or at the
+    # end of the file, so no line is cut in two
+    size = Path(fpath).stat().st_size
+    n_chunk = max(min_chunks, -(-size // chunk_size), 1)
+
+    bounds = [0]
+    with open(fpath, "rb") as f:
+        for i in range(1, n_chunk):
+            target = max(i * size // n_chunk, bounds[-1])
+            f.seek(target)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for (start, end) in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _context():
+    # Forked workers inherit the day modules already imported by the parent,
+    # which 'spawn' could not import again by name
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def map_ranges(func: Callable, fpath: str, ranges: List[Tuple[int, int]],
+               n_worker: Optional[int] = None, *args) -> list:
+    # Calls 'func(fpath, start, end, *args)' for every range, in a process
+    # pool, and returns the results in the order of the ranges
+    jobs = [(fpath, start, end, *args) for (start, end) in ranges]
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    if (n_worker == 1) or (len(jobs) <= 1):
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(n_worker, len(jobs)), mp_context=_context()) as executor:
+        return list(executor.map(func, *zip(*jobs)))
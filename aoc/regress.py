@@ -0,0 +1,207 @@
+import argparse
+import io
+import json
+from contextlib import redirect_stdout
+from copy import deepcopy
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional
+import sys
+import numpy as np
+
+from aoc import instrument
+from aoc.days import ROOT_DIR, DayModule, discover_days, load_day
+from aoc.runner import solve
+
+
+BASELINE_PATH = ROOT_DIR / "baselines.json"
+# Inputs used for a day when the baseline doesn't name one
+DEFAULT_INPUTS = ("test-data.dat", "data.dat")
+PARTS = ("part1", "part2")
+
+
+class PartStats(NamedTuple):
+    median: float
+    # Median absolute deviation of the timings
+    mad: float
+    peak_memory: int
+
+
+def robust_stats(samples: List[float], peak_memory: int) -> PartStats:
+    centre = median(samples)
+    return PartStats(centre, median(abs(s - centre) for s in samples), peak_memory)
+
+
+def calibrate(n_repeat: int = 5) -> float:
+    # A fixed mix of interpreter and NumPy work; timings are compared relative
+    # to it so that a slower or busier machine doesn't read as a regression
+    def workload() -> None:
+        sum(i * i for i in range(100000))
+        np.sort(np.arange(200000)[::-1] % 1013)
+
+    samples = []
+    for _ in range(n_repeat):
+        start = perf_counter()
+        workload()
+        samples.append(perf_counter() - start)
+    return median(samples)
+
+
+def time_parts(day_module: DayModule, fpath: Path, n_repeat: int) -> Dict[str, List[float]]:
+    inputs = day_module.load_inputs(fpath)
+    samples = {part: [] for part in PARTS}
+    for _ in range(n_repeat):
+        inputs1 = deepcopy(inputs)
+        start = perf_counter()
+        answer1 = day_module.solve_pt1(*inputs1)
+        samples["part1"].append(perf_counter() - start)
+
+        (_, inputs2) = day_module.split_answer(answer1, deepcopy(inputs))
+        start = perf_counter()
+        day_module.solve_pt2(*inputs2)
+        samples["part2"].append(perf_counter() - start)
+    return samples
+
+
+def memory_parts(day_module: DayModule, fpath: Path) -> Dict[str, int]:
+    # Tracing allocations slows everything down, so memory gets its own run
+    instrument.enable(track_memory=True)
+    instrument.reset()
+    try:
+        solve(day_module, fpath)
+        peaks = {m.name: m.peak_memory for m in instrument.measurements()}
+    finally:
+        instrument.disable()
+    return {part: peaks[part] for part in PARTS}
+
+
+def measure_day(day: int, input_name: str, n_repeat: int) -> dict:
+    day_module = load_day(discover_days()[day])
+    fpath = day_module.day.directory / input_name
+    with redirect_stdout(io.StringIO()):
+        calibration = calibrate()
+        samples = time_parts(day_module, fpath, n_repeat)
+        peaks = memory_parts(day_module, fpath)
+    stats = {part: robust_stats(samples[part], peaks[part]) for part in PARTS}
+    return {"input": input_name, "calibration": calibration, **stats}
+
+
+def default_input(day: int) -> Optional[str]:
+    directory = discover_days()[day].directory
+    for name in DEFAULT_INPUTS:
+        if (directory / name).exists():
+            return name
+    return None
+
+
+def compare(day: int, baseline: dict, current: dict,
+            tolerance: float, memory_tolerance: float,
+            min_seconds: float = 1.0e-03, min_bytes: int = 64 * 1024) -> List[str]:
+    regressions = []
+    speed_ratio = current["calibration"] / baseline["calibration"]
+    for part in PARTS:
+        (base, cur) = (baseline[part], current[part])
+        base = base._replace(median=base.median * speed_ratio, mad=base.mad * speed_ratio)
+
+        # Timings only count as slower once they clear the tolerance, the
+        # spread of both sets of runs and a floor for tiny timings
+        noise = 3.0 * (base.mad + cur.mad)
+        allowed = max(tolerance * base.median, noise, min_seconds)
+        if cur.median - base.median > allowed:
+            regressions.append(
+                f"Day {day} {part}: time {cur.median:.4f}s vs baseline "
+                f"{base.median:.4f}s (+{(cur.median / base.median - 1) * 100:.0f}%)")
+
+        allowed = max(memory_tolerance * base.peak_memory, min_bytes)
+        if cur.peak_memory - base.peak_memory > allowed:
+            regressions.append(
+                f"Day {day} {part}: peak memory {cur.peak_memory} B vs baseline "
+                f"{base.peak_memory} B")
+    return regressions
+
+
+def load_baselines(fpath: Path) -> dict:
+    if not fpath.exists():
+        return {}
+    with open(fpath, "r") as f:
+        baselines = json.load(f)
+    for entry in baselines.values():
+        for part in PARTS:
+            entry[part] = PartStats(**entry[part])
+    return baselines
+
+
+def save_baselines(fpath: Path, baselines: dict) -> None:
+    serialisable = {}
+    for (day, entry) in sorted(baselines.items(), key=lambda x: int(x[0])):
+        serialisable[day] = {k: (v._asdict() if isinstance(v, PartStats) else v)
+                             for (k, v) in entry.items()}
+    with open(fpath, "w") as f:
+        json.dump(serialisable, f, indent=2)
+        f.write("\n")
+
+
+def parse_input_overrides(overrides: List[str]) -> Dict[int, str]:
+    inputs = {}
+    for override in overrides:
+        (day, name) = override.split("=")
+        inputs[int(day)] = name
+    return inputs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check solutions against performance baselines")
+    parser.add_argument("-d", "--days", type=int, nargs="+", default=None,
+                        help="days to check (default: every day in the baseline file)")
+    parser.add_argument("-b", "--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="timed runs per day; the median is compared")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before failing")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="allowed relative growth in peak memory before failing")
+    parser.add_argument("--input", nargs="+", default=[], metavar="DAY=FILE",
+                        help="input file to use for a day, e.g. 19=example-data1.dat")
+    parser.add_argument("--update", action="store_true",
+                        help="record the current performance as the new baseline")
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baseline)
+    overrides = parse_input_overrides(args.input)
+    days = args.days
+    if days is None:
+        days = sorted(map(int, baselines)) if (baselines and not args.update) else list(discover_days())
+
+    regressions = []
+    for day in days:
+        entry = baselines.get(str(day), {})
+        input_name = overrides.get(day, entry.get("input") or default_input(day))
+        if input_name is None:
+            print(f"Day {day}: no input to measure; skipping")
+            continue
+
+        current = measure_day(day, input_name, args.repeat)
+        print(f"Day {day:>2} {input_name:<20} " + "  ".join(
+            f"{part}: {current[part].median:.4f}s ±{current[part].mad:.4f}s "
+            f"{current[part].peak_memory / 2 ** 20:.2f} MiB" for part in PARTS))
+
+        if args.update:
+            baselines[str(day)] = current
+        elif str(day) not in baselines:
+            print(f"Day {day}: no baseline recorded; run with --update")
+        else:
+            regressions += compare(day, entry, current, args.tolerance, args.memory_tolerance)
+
+    if args.update:
+        save_baselines(args.baseline, baselines)
+        print(f"Baselines written to {args.baseline}")
+        return 0
+
+    for message in regressions:
+        print(f"REGRESSION: {message}", file=sys.stderr)
+    return int(len(regressions) > 0)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+import argparse
+import io
+import json
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from copy import deepcopy
+from pathlib import Path
+from time import perf_counter
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from aoc import instrument
+from aoc.days import discover_days, load_day
+
+
+class RunResult(NamedTuple):
+    day: int
+    input: str
+    answer1: Any
+    answer2: Any
+    elapsed: float
+    output: str
+    error: Optional[str]
+    # Measurements and counters recorded by 'aoc.instrument', if enabled
+    metrics: Optional[dict] = None
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+def to_builtin(value: Any) -> Any:
+    # NumPy scalars are not JSON serialisable
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def solve(day_module, fpath: Path) -> Tuple[Any, Any]:
+    with instrument.measure("load"):
+        inputs = day_module.load_inputs(fpath)
+    pt1_inputs = deepcopy(inputs)
+    with instrument.measure("part1"):
+        answer1 = day_module.solve_pt1(*pt1_inputs)
+    (answer1, inputs) = day_module.split_answer(answer1, inputs)
+    with instrument.measure("part2"):
+        answer2 = day_module.solve_pt2(*inputs)
+    return (answer1, answer2)
+
+
+class RunOptions(NamedTuple):
+    metrics: bool = False
+    profile_dir: Optional[str] = None
+
+
+def run_job(job: Tuple[int, str, RunOptions]) -> RunResult:
+    (day_number, fpath, options) = job
+    fpath = Path(fpath)
+    if options.metrics or (options.profile_dir is not None):
+        profile_dir = options.profile_dir
+        if profile_dir is not None:
+            profile_dir = str(Path(profile_dir) / f"day{day_number}-{fpath.stem}")
+        instrument.enable(profile_dir=profile_dir)
+        instrument.reset()
+
+    (answer1, answer2, error) = (None, None, None)
+    stdout = io.StringIO()
+    start = perf_counter()
+    try:
+        with redirect_stdout(stdout):
+            day_module = load_day(discover_days()[day_number])
+            (answer1, answer2) = solve(day_module, fpath)
+    except Exception:
+        error = traceback.format_exc()
+    elapsed = perf_counter() - start
+
+    metrics = instrument.snapshot() if instrument.enabled() else None
+    return RunResult(day_number, fpath.name, to_builtin(answer1),
+                     to_builtin(answer2), elapsed, stdout.getvalue(), error,
+                     metrics)
+
+
+def collect_jobs(days: Optional[List[int]] = None,
+                 patterns: List[str] = ("*.dat",),
+                 options: RunOptions = RunOptions()) -> List[Tuple[int, str, RunOptions]]:
+    all_days = discover_days()
+    if days is None:
+        days = list(all_days)
+
+    jobs = []
+    for number in days:
+        if number not in all_days:
+            raise ValueError(f"ERROR: No solution found for day {number}")
+        for fpath in all_days[number].inputs(patterns):
+            jobs.append((number, str(fpath), options))
+    return jobs
+
+
+def run(jobs: List[Tuple[int, str, RunOptions]],
+        n_worker: Optional[int] = None) -> List[RunResult]:
+    if n_worker == 1:
+        results = list(map(run_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=n_worker) as executor:
+            results = list(executor.map(run_job, jobs))
+    return sorted(results, key=lambda r: (r.day, r.input))
+
+
+def print_results(results: List[RunResult]) -> None:
+    for r in results:
+        status = "ok" if r.error is None else "FAILED"
+        print(f"Day {r.day:>2} {r.input:<20} [{status}] {r.elapsed:8.3f}s  "
+              f"Part 1: {r.answer1}  Part 2: {r.answer2}")
+        if r.metrics is not None:
+            for m in r.metrics["measurements"]:
+                memory = "" if m["peak_memory"] is None else f", peak {m['peak_memory'] / 2 ** 20:.2f} MiB"
+                print(f"    {m['name']:<10} wall {m['wall']:.3f}s, cpu {m['cpu']:.3f}s{memory}")
+            for (name, value) in r.metrics["counters"].items():
+                print(f"    {name}: {value}")
+        if r.error is not None:
+            print(r.error)
+
+
+def write_metrics_csv(fpath: Path, results: List[RunResult]) -> None:
+    rows = []
+    for r in results:
+        if r.metrics is not None:
+            rows += instrument.snapshot_rows(r.metrics, day=r.day, input=r.input)
+    instrument.write_csv(fpath, rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run Advent of Code solutions")
+    parser.add_argument("-d", "--days", type=int, nargs="+", default=None,
+                        help="days to run (default: all)")
+    parser.add_argument("-i", "--inputs", nargs="+", default=["*.dat"],
+                        help="glob patterns for input files in each day directory")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("-m", "--metrics", action="store_true",
+                        help="record wall time, CPU time, peak memory and counters")
+    parser.add_argument("--profile", type=str, default=None, metavar="DIR",
+                        help="save cProfile stats for load, part 1 and part 2 to DIR")
+    parser.add_argument("--json", type=Path, default=None,
+                        help="write the results to this JSON file")
+    parser.add_argument("--csv", type=Path, default=None,
+                        help="write the recorded metrics to this CSV file")
+    args = parser.parse_args()
+
+    options = RunOptions(args.metrics or (args.csv is not None), args.profile)
+    jobs = collect_jobs(args.days, args.inputs, options)
+    start = perf_counter()
+    results = run(jobs, n_worker=args.workers)
+    elapsed = perf_counter() - start
+
+    print_results(results)
+    print(f"Ran {len(results)} inputs in {elapsed:.3f}s")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump([r.as_dict() for r in results], f, indent=2)
+    if args.csv is not None:
+        write_metrics_csv(args.csv, results)
+
+    return int(any(r.error is not None for r in results))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,39 +1,93 @@
+import os
+import sys
 from pathlib import Path
-from typing import List
+from typing import Iterable, Optional, Tuple
+import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import load_ints  # noqa: E402
+from aoc.parallel import byte_ranges, map_ranges  # noqa: E402
 
-DATAFILE_PATH = Path.cwd() / "data.dat"
 
+DATA_DIR = Path(__file__).resolve().parent
+DATAFILE_PATH = DATA_DIR / "data.dat"
 
-def solve_pt1(measurements: List[int]) -> int:
-    counter = 0
-    for i in range(len(measurements) - 1):
-        counter += (measurements[i + 1] > measurements[i])
+
+def count_increases(measurements: np.ndarray, window: int = 1) -> int:
+    # The sums of two neighbouring windows share all but their first and last
+    # readings, so the later sum is larger exactly when a[i + window] > a[i]
+    if window < 1:
+        raise ValueError(f"ERROR: Window size must be positive, got {window}")
+    measurements = np.asarray(measurements)
+    if len(measurements) <= window:
+        return 0
+    return int(np.count_nonzero(measurements[window:] > measurements[:-window]))
+
+
+def count_increases_stream(chunks: Iterable[np.ndarray], window: int = 1) -> int:
+    # Same as 'count_increases' over the concatenated chunks, but only the
+    # last 'window' readings are kept between chunks
+    if window < 1:
+        raise ValueError(f"ERROR: Window size must be positive, got {window}")
+    (counter, tail) = (0, np.zeros((0,), dtype=np.int64))
+    for chunk in chunks:
+        readings = np.concatenate((tail, np.atleast_1d(chunk)))
+        counter += count_increases(readings, window)
+        tail = readings[-window:]
     return counter
 
 
-def solve_pt2(measurements: List[int]) -> int:
-    def sum_sliding_window(arr: List[int], start_index: int) -> int:
-        return arr[start_index] + arr[start_index + 1] + arr[start_index + 2]
-    counter = 0
-    for i in range(len(measurements) - 3):
-        counter += (sum_sliding_window(measurements, i + 1) > sum_sliding_window(measurements, i))
+def _count_range(fpath: str, start: int, end: int,
+                 window: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    readings = load_ints(fpath, byte_range=(start, end))
+    return (count_increases(readings, window), readings[:window], readings[-window:])
+
+
+def count_increases_parallel(fpath: str, window: int = 1,
+                             n_worker: Optional[int] = None) -> int:
+    # Counts each line-aligned chunk of the file in a worker process; every
+    # chunk also returns its first and last 'window' readings so that the
+    # comparisons straddling chunk edges can be added afterwards
+    if window < 1:
+        raise ValueError(f"ERROR: Window size must be positive, got {window}")
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    ranges = byte_ranges(fpath, min_chunks=n_worker)
+    results = map_ranges(_count_range, fpath, ranges, n_worker, window)
+
+    (counter, tail) = (0, np.zeros((0,), dtype=np.int64))
+    for (chunk_count, head, chunk_tail) in results:
+        # Only comparisons starting in the previous tail cross the edge
+        edge = np.concatenate((tail, head))
+        crossing = edge[window:] > edge[:-window]
+        counter += chunk_count + int(np.count_nonzero(crossing[:len(tail)]))
+        tail = np.concatenate((tail, chunk_tail))[-window:]
     return counter
 
 
-def load_measurements() -> List[int]:
-    measurements = None
-    with open(DATAFILE_PATH, "r") as f:
-        measurements = f.readlines()
-    measurements = list(map(int, measurements))
-    return measurements
+def solve_pt1(measurements: np.ndarray) -> int:
+    return count_increases(measurements, window=1)
+
+
+def solve_pt2(measurements: np.ndarray) -> int:
+    return count_increases(measurements, window=3)
+
+
+def load_measurements(fpath: str = DATAFILE_PATH) -> np.ndarray:
+    return load_ints(fpath)
 
 
 def main() -> int:
-    measurements = load_measurements()
+    with measure("load"):
+        measurements = load_measurements()
     print(f"Number of measurements: {len(measurements)}")
-    print(f"Answer to Part 1: {solve_pt1(measurements)}")
-    print(f"Answer to Part 2: {solve_pt2(measurements)}")
+    with measure("part1"):
+        answer1 = solve_pt1(measurements)
+    with measure("part2"):
+        answer2 = solve_pt2(measurements)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":
@@ -1,90 +1,322 @@
+import os
+import sys
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import map_bytes  # noqa: E402
+from aoc.parallel import byte_ranges, map_ranges  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
 
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
-MATCHING_OPEN_BRACKET = {")": "(", "]":  "[", "}":  "{", ">":  "<"}
-MATCHING_CLOSE_BRACKET = {"(": ")", "[":  "]", "{":  "}", "<":  ">"}
 
+# Every byte becomes a small code: 0-3 for "([{<", 4-7 for the matching
+# ")]}>" (so a pair differs by 4), 8 for a newline and 9 for anything else
+(N_BRACKET, LINE_END, OTHER) = (4, 8, 9)
+BRACKET_CODES = np.full((256,), OTHER, dtype=np.int8)
+for (code, char) in enumerate(b"([{<)]}>\n"):
+    BRACKET_CODES[char] = code
 
-def is_corrupted(s: str) -> Tuple[bool, str, List[str]]:
-    is_corrupt = False
-    illegal_char = None
-    stack = []
-    for c in s:
-        if c in "([{<":
-            stack.append(c)
-        else:
-            open_bracket = stack.pop()
-            if open_bracket != MATCHING_OPEN_BRACKET[c]:
-                is_corrupt = True
-                illegal_char = c
-                break
-    return (is_corrupt, illegal_char, stack)
+# The same codes as a table for bytes.translate
+BRACKET_TABLE = BRACKET_CODES.astype(np.uint8).tobytes()
+CLOSING_BRACKETS = ")]}>"
 
+# Indexed by the code of the closing bracket (minus 4)
+PENALTY = np.array([3, 57, 1197, 25137], dtype=np.int64)
+# Indexed by the code of the opening bracket that still needs closing
+COMPLETION_POINTS = np.array([1, 2, 3, 4], dtype=np.int64)
+# Completion scores are sums of points * 5^depth. Each run of this many
+# levels is summed in int64 without overflowing; only stacks deeper than
+# that need Python integers to add the runs together
+MAX_INT64_DEPTH = 27
+# The scan keeps about 20 bytes of temporaries per byte of input, so it
+# works on blocks of about this many bytes and its peak memory depends on
+# the block size rather than on the size of the file
+BLOCK_SIZE = 1 << 16
 
-def solve_pt1(report: List[str]) -> int:
-    penalty = {")": 3, "]": 57, "}": 1197, ">": 25137}
-    corruptions = []
-    for line in report:
-        (is_corrupt, illegal_char, _) = is_corrupted(line)
-        if is_corrupt:
-            corruptions.append(illegal_char)
 
-    costs = list(map(lambda x: penalty[x], corruptions))
-    return sum(costs)
+class LineScan(NamedTuple):
+    # Illegal closing character (as a code, 4-7) of every corrupted line and
+    # the completion score of every incomplete line
+    illegal_codes: np.ndarray
+    completion_scores: np.ndarray
 
+    def syntax_error_score(self) -> int:
+        return int(np.sum(PENALTY[self.illegal_codes - N_BRACKET]))
 
-def solve_pt2(report: List[str]) -> int:
-    score_map = {")": 1, "]": 2, "}": 3, ">": 4}
+    def middle_score(self) -> int:
+        # Selection rather than a full sort; the middle is all that's needed
+        middle = (len(self.completion_scores) - 1) // 2
+        return int(np.partition(self.completion_scores, middle)[middle])
 
-    legal_lines = [x for x in report if not is_corrupted(x)[0]]
 
-    scores = []
-    for l in legal_lines:
-        bracket_scores = None
-        (_, _, stack) = is_corrupted(l)
-        if len(stack) > 0:
-            required_closing_brackets = list(
-                map(lambda x: MATCHING_CLOSE_BRACKET[x], reversed(stack)))
-            bracket_scores = list(
-                map(lambda x: score_map[x], required_closing_brackets))
+def merge_scans(scans: List[LineScan]) -> LineScan:
+    return LineScan(np.concatenate([scan.illegal_codes for scan in scans]),
+                    np.concatenate([scan.completion_scores for scan in scans]))
 
-        score = 0
-        for b in bracket_scores:
-            score *= 5
-            score += b
-        scores.append(score)
 
-    mid = (len(scores) - 1) / 2
-    return sorted(scores)[int(mid)]
+def _spread(values: np.ndarray, starts: np.ndarray, size: int) -> np.ndarray:
+    # Repeats each value over its group; groups run from one start to the next
+    return np.repeat(values, np.diff(np.append(starts, size)))
 
 
-def load_report(fpath: str) -> List[str]:
-    report = None
-    with open(fpath, "r") as f:
-        report = f.read().splitlines()
-    return report
+def _bracket_levels(codes: np.ndarray, line_ids: np.ndarray) -> np.ndarray:
+    # Depth after each bracket, restarting at zero on every line. A bracket
+    # pair shares a level: the depth before its opening bracket, which is
+    # the depth after its closing one
+    is_open = (codes < N_BRACKET)
+    steps = 2 * is_open.astype(np.int8) - 1
+    depth = np.cumsum(steps, dtype=np.int32)
+    line_starts = np.flatnonzero(np.diff(line_ids, prepend=-1))
+    depth -= _spread(depth[line_starts] - steps[line_starts], line_starts, len(codes))
+    depth -= is_open
+    return depth
+
+
+def _group_by_level(levels: np.ndarray, line_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Orders the brackets by level, keeping file order within a level so
+    # that each line's brackets at a level stay together, and flags which
+    # brackets are in the same (line, level) group as the one before them.
+    # Levels are small, so the stable sort is a radix sort
+    levels -= np.min(levels)
+    if np.max(levels) <= np.iinfo(np.int16).max:
+        levels = levels.astype(np.int16)
+    order = np.argsort(levels, kind="stable")
+    if len(order) <= np.iinfo(np.int32).max:
+        order = order.astype(np.int32)
+    same_group = (levels[order[1:]] == levels[order[:-1]])
+    same_group &= (line_ids[order[1:]] == line_ids[order[:-1]])
+    return (order, same_group)
+
+
+def _first_illegal(codes: np.ndarray, line_ids: np.ndarray, order: np.ndarray,
+                   same_group: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Within a group a valid line alternates between an opening bracket and
+    # its closing one, so a closing bracket that doesn't follow its partner
+    # is illegal; the first of these in a line is where it's corrupted
+    s_codes = codes[order]
+    is_illegal = (s_codes >= N_BRACKET)
+    is_illegal[1:] &= ~same_group | (s_codes[1:] != s_codes[:-1] + N_BRACKET)
+    illegal_at = np.sort(order[is_illegal])
+    illegal_lines = line_ids[illegal_at]
+    first = np.flatnonzero(np.diff(illegal_lines, prepend=-1))
+    return (illegal_lines[first], codes[illegal_at[first]])
+
+
+def _unclosed(codes: np.ndarray, line_ids: np.ndarray, order: np.ndarray,
+              same_group: np.ndarray, corrupt_lines: np.ndarray) -> np.ndarray:
+    # In lines that aren't corrupted, the brackets left open are the opening
+    # brackets that end their group; returned in file order
+    is_corrupt = np.zeros((int(line_ids[-1]) + 1,), dtype=bool)
+    is_corrupt[corrupt_lines] = True
+    still_open = (codes[order] < N_BRACKET)
+    still_open[:-1] &= ~same_group
+    open_at = np.sort(order[still_open])
+    return open_at[~is_corrupt[line_ids[open_at]]]
+
+
+def _completion_scores(open_codes: np.ndarray, open_lines: np.ndarray) -> np.ndarray:
+    # Unclosed brackets sit at levels 0, 1, 2, ... of their line's stack
+    line_first = np.flatnonzero(np.diff(open_lines, prepend=-1))
+    stack_levels = np.arange(len(open_codes)) - _spread(line_first, line_first, len(open_codes))
+
+    # Sum each run of MAX_INT64_DEPTH levels in int64, then join the runs
+    (runs, run_levels) = np.divmod(stack_levels, MAX_INT64_DEPTH)
+    terms = COMPLETION_POINTS[open_codes] * 5 ** run_levels
+    new_run = (np.diff(open_lines, prepend=-1) != 0) | (np.diff(runs, prepend=-1) != 0)
+    run_starts = np.flatnonzero(new_run)
+    run_sums = np.add.reduceat(terms, run_starts)
+    (run_lines, runs) = (open_lines[run_starts], runs[run_starts])
+    if np.any(runs > 0):
+        run_sums = run_sums.astype(object) * (5 ** MAX_INT64_DEPTH) ** runs.astype(object)
+    score_starts = np.flatnonzero(np.diff(run_lines, prepend=-1))
+    return np.add.reduceat(run_sums, score_starts)
+
+
+def _scan_block(raw: np.ndarray) -> LineScan:
+    codes = BRACKET_CODES[raw]
+    is_line_end = (codes == LINE_END)
+    line_ids = np.cumsum(is_line_end, dtype=np.int32)
+    keep = (codes < LINE_END)
+    (codes, line_ids) = (codes[keep], line_ids[keep])
+    no_scores = np.zeros((0,), dtype=np.int64)
+    if len(codes) == 0:
+        return LineScan(np.zeros((0,), dtype=np.int8), no_scores)
+
+    (order, same_group) = _group_by_level(_bracket_levels(codes, line_ids), line_ids)
+    (corrupt_lines, illegal_codes) = _first_illegal(codes, line_ids, order, same_group)
+    open_at = _unclosed(codes, line_ids, order, same_group, corrupt_lines)
+    if len(open_at) == 0:
+        return LineScan(illegal_codes, no_scores)
+    return LineScan(illegal_codes, _completion_scores(codes[open_at], line_ids[open_at]))
+
+
+def _line_end(raw: np.ndarray, position: int) -> int:
+    # Index just after the first newline at or after 'position', or the end
+    window = 4096
+    while position < len(raw):
+        found = bytes(raw[position:position + window]).find(b"\n")
+        if found >= 0:
+            return position + found + 1
+        (position, window) = (position + window, 2 * window)
+    return len(raw)
+
+
+def _line_blocks(raw: np.ndarray, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, int]]:
+    # Byte ranges of about 'block_size' that each end just after a newline
+    # or at the end of the buffer, so no line is cut in two
+    start = 0
+    while start < len(raw):
+        end = _line_end(raw, min(start + block_size, len(raw)) - 1)
+        yield (start, end)
+        start = end
+
+
+def scan_lines(raw: np.ndarray, block_size: int = BLOCK_SIZE) -> LineScan:
+    # Lines are independent, so the buffer is scanned one block of whole
+    # lines at a time and the results are joined in order
+    scans = [_scan_block(raw[start:end]) for (start, end) in _line_blocks(raw, block_size)]
+    if not scans:
+        return _scan_block(raw)
+    return merge_scans(scans)
+
+
+class LineResult(NamedTuple):
+    # Exactly one of these is set: the first illegal character of a
+    # corrupted line or the completion score of an incomplete one. Lines
+    # that are complete (balanced) have no result, as in 'scan_lines'
+    illegal_char: Optional[str]
+    completion_score: Optional[int]
+
+
+class StreamValidator:
+    # Validates a stream of bytes fed in chunks of any size; only the
+    # bracket stack of the line in progress is kept between chunks
+    def __init__(self):
+        self._stack: List[int] = []
+        self._illegal_code: Optional[int] = None
+
+    def _end_line(self) -> Optional[LineResult]:
+        result = None
+        if self._illegal_code is not None:
+            result = LineResult(CLOSING_BRACKETS[self._illegal_code - N_BRACKET], None)
+        elif self._stack:
+            score = 0
+            for code in reversed(self._stack):
+                score = 5 * score + int(COMPLETION_POINTS[code])
+            result = LineResult(None, score)
+        (self._stack, self._illegal_code) = ([], None)
+        return result
+
+    def feed(self, chunk: bytes) -> List[LineResult]:
+        # Results for every line that the chunk finishes, in order
+        results = []
+        stack = self._stack
+        for code in chunk.translate(BRACKET_TABLE):
+            if code == LINE_END:
+                result = self._end_line()
+                if result is not None:
+                    results.append(result)
+                stack = self._stack
+            elif code == OTHER:
+                continue
+            elif self._illegal_code is None:
+                if code < N_BRACKET:
+                    stack.append(code)
+                elif (not stack) or (stack.pop() != code - N_BRACKET):
+                    self._illegal_code = code
+        return results
+
+    def close(self) -> List[LineResult]:
+        # Finishes a last line that has no newline after it
+        result = self._end_line()
+        return [] if result is None else [result]
+
+
+def validate_stream(fpath: str, chunk_size: int = 1 << 16) -> Iterator[LineResult]:
+    validator = StreamValidator()
+    with open(fpath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield from validator.feed(chunk)
+    yield from validator.close()
+
+
+def _scan_range(fpath: str, start: int, end: int, block_size: int) -> LineScan:
+    return scan_lines(map_bytes(fpath)[start:end], block_size)
+
+
+def scan_parallel(fpath: str, n_worker: Optional[int] = None,
+                  block_size: int = BLOCK_SIZE) -> LineScan:
+    # Lines are independent, so each newline-aligned chunk of the file is
+    # scanned in its own worker and the results are simply joined. Workers
+    # scan their chunk a block at a time, so each one needs memory for a
+    # block rather than for its whole chunk of a many-GB log
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    ranges = byte_ranges(fpath, min_chunks=n_worker)
+    scans = map_ranges(_scan_range, fpath, ranges, n_worker, block_size)
+    if not scans:
+        return scan_lines(np.zeros((0,), dtype=np.uint8))
+    return merge_scans(scans)
+
+
+def solve_pt1(report: np.ndarray) -> Tuple[int, LineScan]:
+    # Each line is classified once; part 2 reads its scores from the same scan
+    scan = scan_lines(report)
+    return (scan.syntax_error_score(), scan)
+
+
+def solve_pt2(scan: LineScan) -> int:
+    return scan.middle_score()
+
+
+def load_report(fpath: str) -> np.ndarray:
+    return map_bytes(fpath)
 
 
 def main() -> int:
-    example_report = load_report(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_report = load_report(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (26397, 288957)
-    print(f"Number of entries in report: {len(example_report)}")
-    print(f"Answer to Part 1: {solve_pt1(example_report)}")
-    print(f"Answer to Part 2: {solve_pt2(example_report)}")
-    assert solve_pt1(example_report) == example_answer1
-    assert solve_pt2(example_report) == example_answer2
+    with measure("part1"):
+        (answer1, scan) = solve_pt1(example_report)
+    with measure("part2"):
+        answer2 = solve_pt2(scan)
+    print(f"Number of entries in report: {len(scan.illegal_codes) + len(scan.completion_scores)}")
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
+    assert answer1 == example_answer1
+    assert answer2 == example_answer2
+
+    parallel_scan = scan_parallel(EXAMPLE_DATA_PATH, n_worker=2)
+    assert parallel_scan.syntax_error_score() == example_answer1
+    assert parallel_scan.middle_score() == example_answer2
+
+    results = list(validate_stream(EXAMPLE_DATA_PATH, chunk_size=7))
+    illegal_chars = [r.illegal_char for r in results if r.illegal_char is not None]
+    streamed_scan = LineScan(
+        np.array([CLOSING_BRACKETS.index(c) + N_BRACKET for c in illegal_chars]),
+        np.array([r.completion_score for r in results if r.illegal_char is None]))
+    assert streamed_scan.syntax_error_score() == example_answer1
+    assert streamed_scan.middle_score() == example_answer2
 
     have_test_data = False
     if have_test_data:
-        test_report = load_report(TEST_DATA_PATH)
-        print(f"Number of entries in report: {len(test_report)}")
-        print(f"Answer to Part 1: {solve_pt1(test_report)}")
-        print(f"Answer to Part 2: {solve_pt2(test_report)}")
+        with measure("load"):
+            test_report = load_report(TEST_DATA_PATH)
+        with measure("part1"):
+            (answer1, scan) = solve_pt1(test_report)
+        with measure("part2"):
+            answer2 = solve_pt2(scan)
+        n_line = len(scan.illegal_codes) + len(scan.completion_scores)
+        print(f"Number of entries in report: {n_line}")
+        print(f"Answer to Part 1: {answer1}")
+        print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":
@@ -1,102 +1,234 @@
+import sys
 from pathlib import Path
-from typing import List
-from itertools import product
+from typing import Dict, List, NamedTuple, Optional
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import count, measure  # noqa: E402
+from aoc.loaders import load_digit_grid  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
 
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
-class OctopusGrid:
-    def __init__(self, grid: List[List[int]], nrow: int, ncol: int):
-        self.grid = np.array(grid)
-        self.gridsize = (nrow, ncol)
-        assert self.grid.shape == self.gridsize
-        self.nflash = self._count_flashes()
-        self.nround = 0
 
-    def nflash(self) -> int:
-        return self.nflash
+FLASH_ENERGY = 9
+# Flash totals remembered across the whole batch for cycle detection; once
+# finding the cycles would take more, the grids are only simulated
+MAX_STATES = 1 << 22
 
-    def synchronised(self) -> bool:
-        return np.sum(self.grid == 0) == (self.gridsize[0] * self.gridsize[1])
 
-    def _count_flashes(self) -> int:
-        return np.sum(self.grid > 9)
+class Cycle(NamedTuple):
+    # The state after round 'start + period' repeats the one after 'start'
+    start: int
+    period: int
+
+
+class OctopusGrid:
+    # Simulates one grid of any shape, or a batch of grids of the same shape
+    # stacked as (n_grid, nrow, ncol), all stepped together. Grids can be
+    # retired from the batch once they're no longer needed; 'grid' and
+    # 'ids' only cover the grids still active
+    def __init__(self, grid: np.ndarray, max_states: int = MAX_STATES):
+        grid = np.array(grid, dtype=np.uint8)
+        if grid.ndim not in (2, 3):
+            raise ValueError(f"ERROR: Expected a grid or a batch of grids, got shape {grid.shape}")
+        self.grid = grid.reshape((-1, *grid.shape[-2:]))
+        self.gridsize = self.grid.shape[1:]
+        n_grid = len(self.grid)
+        self.ids = np.arange(n_grid)
+        self.nflash = np.zeros((n_grid,), dtype=np.int64)
+        # Step on which each grid first flashed all at once (-1: not yet)
+        self.first_sync = np.where(self.synchronised(), 0, -1)
+        self.nround = 0
+        self._allocate_buffers()
+
+        # The simulation is deterministic, so once a grid's state repeats it
+        # loops forever. Repeats are found by comparing every grid with a
+        # copy of the batch taken after rounds 0, 1, 2, 4, 8, ... (Brent's
+        # method), which needs one copy per grid rather than every state
+        # seen. The flash totals since the last copy are kept so that a
+        # cycle's flashes per round are known once it's found
+        self.max_states = max_states
+        self.cycles: Dict[int, Cycle] = {}
+        self._cycled = np.zeros((n_grid,), dtype=bool)
+        self._cycle_flashes: Dict[int, np.ndarray] = {}
+        self._checkpoint: Optional[np.ndarray] = self.grid.copy()
+        self._checkpoint_round = 0
+        self._flash_log: List[np.ndarray] = [self.nflash.copy()]
+
+    def _allocate_buffers(self) -> None:
+        # Work buffers reused by every step. New flashes are written into
+        # the middle of a zero-padded grid so that the shifted slices that
+        # count flashing neighbours never run off the edge
+        (n_grid, (nrow, ncol)) = (len(self.grid), self.gridsize)
+        self._flashed = np.zeros(self.grid.shape, dtype=bool)
+        self._new_flashes = np.zeros(self.grid.shape, dtype=bool)
+        self._padded = np.zeros((n_grid, nrow + 2, ncol + 2), dtype=np.uint8)
+        self._row_sums = np.zeros((n_grid, nrow, ncol + 2), dtype=np.uint8)
+        self._neighbours = np.zeros(self.grid.shape, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+    def synchronised(self) -> np.ndarray:
+        return ~np.any(self.grid, axis=(1, 2))
+
+    def _count_flashing_neighbours(self) -> np.ndarray:
+        # 3x3 sums of the new flashes, done as a sum of three rows and then
+        # three columns. The sum includes the octopus itself, which is fine
+        # as a flashing octopus gets reset at the end of the step anyway
+        (padded, row_sums, neighbours) = (self._padded, self._row_sums, self._neighbours)
+        padded[:, 1:-1, 1:-1] = self._new_flashes
+        np.add(padded[:, :-2], padded[:, 1:-1], out=row_sums)
+        row_sums += padded[:, 2:]
+        np.add(row_sums[:, :, :-2], row_sums[:, :, 1:-1], out=neighbours)
+        neighbours += row_sums[:, :, 2:]
+        return neighbours
 
     def step(self) -> None:
         self.grid += 1
 
-        are_new_flashes = True
-        all_highlighted = np.zeros(self.gridsize, dtype=bool)
-        new_flashes = np.zeros(self.gridsize, dtype=bool)
-        while are_new_flashes:
-            # Find new flashes
-            new_flashes = (all_highlighted ^ (self.grid > 9))
-            all_highlighted = (self.grid > 9)
+        (flashed, new_flashes) = (self._flashed, self._new_flashes)
+        flashed[...] = False
+        np.greater(self.grid, FLASH_ENERGY, out=new_flashes)
+        while np.any(new_flashes):
+            count("flash iterations")
+            flashed |= new_flashes
+            self.grid += self._count_flashing_neighbours()
 
-            # Update the neighbours of new flashes
-            (flash_i, flash_j) = np.where(new_flashes)
-            for (fi, fj) in zip(flash_i, flash_j):
-                self._update_neighbours(fi, fj)
+            # Octopuses pushed over the limit by this wave flash next
+            np.greater(self.grid, FLASH_ENERGY, out=new_flashes)
+            new_flashes &= ~flashed
 
-            # If there are no new flashes, we're done
-            if np.sum(all_highlighted ^ (self.grid > 9)) == 0:
-                are_new_flashes = False
-
-        # Count number of flashes in this round and zero out flashing octopuses
-        self.nflash += np.sum(self.grid > 9)
-        self.grid[self.grid > 9] = 0
+        # Count the flashes in this round and zero out flashing octopuses
+        self.nflash[self.ids] += np.count_nonzero(flashed, axis=(1, 2))
+        self.grid[flashed] = 0
 
         # Move onto the next round
         self.nround += 1
+        newly_synced = self.ids[self.synchronised()]
+        newly_synced = newly_synced[self.first_sync[newly_synced] < 0]
+        self.first_sync[newly_synced] = self.nround
+        self._record_states()
+
+    def _record_states(self) -> None:
+        if self._checkpoint is None:
+            return
+        self._flash_log.append(self.nflash[self.ids])
+        repeats = np.all(self.grid == self._checkpoint, axis=(1, 2)) & ~self._has_cycle()
+        if np.any(repeats):
+            start = self._checkpoint_round
+            for index in np.flatnonzero(repeats).tolist():
+                grid_id = int(self.ids[index])
+                self.cycles[grid_id] = Cycle(start, self.nround - start)
+                self._cycle_flashes[grid_id] = np.array([row[index] for row in self._flash_log])
+            self._cycled[self.ids[repeats]] = True
+
+        if self.nround >= max(2 * self._checkpoint_round, 1):
+            self._checkpoint = self.grid.copy()
+            self._checkpoint_round = self.nround
+            self._flash_log = [self._flash_log[-1]]
+        if len(self._flash_log) * len(self) > self.max_states:
+            (self._checkpoint, self._flash_log) = (None, [])
+
+    def retire(self, finished: np.ndarray) -> None:
+        # Stop stepping the grids flagged in 'finished' (one flag per active grid)
+        keep = ~finished
+        for grid_id in self.ids[finished].tolist():
+            self._cycle_flashes.pop(grid_id, None)
+        (self.grid, self.ids) = (self.grid[keep], self.ids[keep])
+        if self._checkpoint is not None:
+            self._checkpoint = self._checkpoint[keep]
+            self._flash_log = [row[keep] for row in self._flash_log]
+        self._allocate_buffers()
+
+    def run(self, n_step: int) -> np.ndarray:
+        for _ in range(n_step):
+            self.step()
+        return self.nflash
 
-    def _valid_ij(self, i: int, j: int) -> bool:
-        (nrow, ncol) = self.gridsize
-        return (i >= 0) & (i < nrow) & (j >= 0) & (j < ncol)
-
-    def _update_neighbours(self, i: int, j: int) -> None:
-        for (di, dj) in product((-1, 0, 1), (-1, 0, 1)):
-            if ((di, dj) != (0, 0)) and self._valid_ij(i + di, j + dj):
-                self.grid[i + di, j + dj] += 1
-
-
-def solve_pt1(data: List[str]) -> int:
-    ogrid = OctopusGrid(data, nrow=10, ncol=10)
-    for i in range(100):
-        ogrid.step()
-    return ogrid.nflash
-
-
-def solve_pt2(data: List[str]) -> int:
-    ogrid = OctopusGrid(data, nrow=10, ncol=10)
-    while not ogrid.synchronised():
-        ogrid.step()
-    return ogrid.nround
-
-
-def load_data(fpath: str) -> List[List[int]]:
-    data = None
-    with open(fpath, "r") as f:
-        data = f.read().splitlines()
-    grid = [list(map(int, list(row))) for row in data]
-    return grid
+    def _has_cycle(self) -> np.ndarray:
+        return self._cycled[self.ids]
+
+    def flashes_after(self, n_step: int) -> np.ndarray:
+        # Total flashes of every active grid after round 'n_step'. Grids are
+        # only simulated until they all cycle; the rest is arithmetic over
+        # the flashes in one period of the cycle
+        if self._flash_log and (self._checkpoint_round <= n_step <= self.nround):
+            return self._flash_log[n_step - self._checkpoint_round].copy()
+        while (self.nround < n_step) and not np.all(self._has_cycle()):
+            self.step()
+        if self.nround == n_step:
+            return self.nflash[self.ids]
+
+        flashes = np.zeros((len(self),), dtype=np.int64)
+        for (index, grid_id) in enumerate(self.ids.tolist()):
+            cycle = self.cycles.get(grid_id)
+            if (cycle is None) or (n_step < cycle.start):
+                raise ValueError(f"ERROR: Round {n_step} is past and too old to be remembered")
+            (n_cycle, offset) = divmod(n_step - cycle.start, cycle.period)
+            cycle_flashes = self._cycle_flashes[grid_id]
+            flashes[index] = cycle_flashes[offset] + n_cycle * (cycle_flashes[-1] - cycle_flashes[0])
+        return flashes
+
+    def run_until_synchronised(self, max_step: Optional[int] = None) -> np.ndarray:
+        # Grids drop out of the batch as soon as they have synchronised, or
+        # once they cycle without having done so, as then they never will;
+        # any still going after 'max_step' rounds are also left with -1
+        while len(self) > 0:
+            finished = (self.first_sync[self.ids] >= 0) | self._has_cycle()
+            if np.any(finished):
+                self.retire(finished)
+            if (len(self) == 0) or ((max_step is not None) and (self.nround >= max_step)):
+                break
+            self.step()
+        return self.first_sync
+
+
+def solve_pt1(data: np.ndarray) -> int:
+    ogrid = OctopusGrid(data)
+    return int(ogrid.flashes_after(100)[0])
+
+
+def solve_pt2(data: np.ndarray) -> int:
+    ogrid = OctopusGrid(data)
+    return int(ogrid.run_until_synchronised()[0])
+
+
+def load_data(fpath: str) -> np.ndarray:
+    return load_digit_grid(fpath)
 
 
 def main():
-    example_data = load_data(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_data = load_data(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (1656, 195)
     print(f"Number of entries in data: {len(example_data)}")
-    print(f"Answer to Part 1: {solve_pt1(example_data)}")
-    print(f"Answer to Part 2: {solve_pt2(example_data)}")
-    assert solve_pt1(example_data) == example_answer1
-    assert solve_pt2(example_data) == example_answer2
-
-    test_data = load_data(TEST_DATA_PATH)
+    with measure("part1"):
+        answer1 = solve_pt1(example_data)
+    with measure("part2"):
+        answer2 = solve_pt2(example_data)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
+    assert answer1 == example_answer1
+    assert answer2 == example_answer2
+
+    # After synchronising, the example repeats every 10 rounds with all 100
+    # octopuses flashing once per cycle
+    ogrid = OctopusGrid(example_data)
+    assert ogrid.flashes_after(10 ** 9)[0] == ogrid.flashes_after(10 ** 9 - 10)[0] + 100
+
+    with measure("load"):
+        test_data = load_data(TEST_DATA_PATH)
     print(f"Number of entries in data: {len(test_data)}")
-    print(f"Answer to Part 1: {solve_pt1(test_data)}")
-    print(f"Answer to Part 2: {solve_pt2(test_data)}")
+    with measure("part1"):
+        answer1 = solve_pt1(test_data)
+    with measure("part2"):
+        answer2 = solve_pt2(test_data)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":
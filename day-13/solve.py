@@ -1,10 +1,16 @@
+import sys
 from pathlib import Path
-from typing import List
+from typing import List, NamedTuple, Optional, Tuple
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import parse_ints  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
 
 def print_paper(p):
@@ -15,81 +21,180 @@ def print_paper(p):
     print(f"\n{string}\n")
 
 
-def apply_folds(paper: np.ndarray, folds: List[List[int]]) -> np.ndarray:
-    for (axis, pos) in folds:
-        (p1, _, p2) = np.split(paper, [pos, pos+1], axis=axis)
-        p2 = np.flip(p2, axis=axis)
-        (p1, p2) = sorted([p1, p2], key=lambda x: x.shape[axis], reverse=True)
-        overlap = p2.shape[axis]
-        if axis == 0:
-            p1[-overlap:, :] |= p2[-overlap:, :]
-        elif axis == 1:
-            p1[:, -overlap:] |= p2[:, -overlap:]
-        paper = p1
+def paper_extent(dots: np.ndarray) -> np.ndarray:
+    if len(dots) == 0:
+        return np.zeros((2,), dtype=np.int64)
+    return np.max(dots, axis=0) + 1
+
+
+def _first_of_each(keys: np.ndarray) -> np.ndarray:
+    # Index of one entry for every distinct key; sorting puts equal keys together
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    return order[np.append(True, sorted_keys[1:] != sorted_keys[:-1])] if len(keys) > 0 else order
+
+
+class AxisMap(NamedTuple):
+    # Where the coordinates along one axis end up after some folds along it.
+    # Each fold reflects part of the axis, so the composition is piecewise
+    # 'offset + sign * x' over the ranges [start, end); coordinates between
+    # the ranges landed on a fold line and were lost. Each fold can at most
+    # double the ranges, and there are never more than the sheet is wide
+    starts: np.ndarray
+    ends: np.ndarray
+    offsets: np.ndarray
+    signs: np.ndarray
+
+    @staticmethod
+    def identity(size: int) -> "AxisMap":
+        return AxisMap(*(np.array([value], dtype=np.int64) for value in (0, size, 0, 1)))
+
+    def then_fold(self, pos: int, size: int) -> "AxisMap":
+        # Split every range at the coordinate that lands on the fold line,
+        # dropping that coordinate, then reflect each part. A fold at 'pos'
+        # reflects coordinates past it with 'where(x > pos, 2 pos - x, x)'
+        # when the part kept is the longer one; when it's the shorter one
+        # the folded part is longer, so both sides are measured back from
+        # its far edge instead. Both cases are 'size - |x - pos|'
+        cuts = self.signs * (pos - self.offsets)
+        is_cut = (cuts >= self.starts) & (cuts < self.ends)
+        starts = np.stack((self.starts, np.where(is_cut, cuts + 1, self.ends)), axis=1).ravel()
+        ends = np.stack((np.where(is_cut, cuts, self.ends), self.ends), axis=1).ravel()
+        (offsets, signs) = (np.repeat(self.offsets, 2), np.repeat(self.signs, 2))
+        keep = (starts < ends)
+        (starts, ends, offsets, signs) = (starts[keep], ends[keep], offsets[keep], signs[keep])
+
+        below = (offsets + signs * starts < pos)
+        offsets = np.where(below, size - pos + offsets, size + pos - offsets)
+        return AxisMap(starts, ends, offsets, np.where(below, signs, -signs))
+
+    def apply(self, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Folded coordinates and whether each one is still on the sheet
+        pieces = np.searchsorted(self.starts, coords, side="right") - 1
+        on_sheet = (pieces >= 0)
+        pieces = np.maximum(pieces, 0)
+        on_sheet &= (coords < self.ends[pieces])
+        return (self.offsets[pieces] + self.signs[pieces] * coords, on_sheet)
+
+
+class FoldPlan:
+    # A fold only moves coordinates along its own axis, and folds along one
+    # axis compose into a single piecewise reflection. So the fold list
+    # compiles into one AxisMap per axis and number of folds made along it,
+    # and mapping the dots through any number of folds is one lookup of
+    # their coordinates per axis
+    def __init__(self, folds: List[List[int]], extent: np.ndarray):
+        extent = np.array(extent, dtype=np.int64)
+        self.folds = folds
+        self.extents = [extent.copy()]
+        self.axis_maps = ([AxisMap.identity(extent[0])], [AxisMap.identity(extent[1])])
+        # Folds made along each axis after each number of folds overall
+        self.axis_folds = [(0, 0)]
+        for (axis, pos) in folds:
+            size = max(pos, int(extent[axis]) - 1 - pos)
+            self.axis_maps[axis].append(self.axis_maps[axis][-1].then_fold(pos, size))
+
+            extent[axis] = size
+            self.extents.append(extent.copy())
+            n_fold = list(self.axis_folds[-1])
+            n_fold[axis] += 1
+            self.axis_folds.append(tuple(n_fold))
+
+    def __len__(self) -> int:
+        return len(self.folds)
+
+    def _map(self, dots: np.ndarray, n_fold: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Coordinates of the dots after 'n_fold' folds, as a key per dot
+        # and whether each dot is still on the sheet
+        (n_fold_i, n_fold_j) = self.axis_folds[n_fold]
+        (i, on_sheet_i) = self.axis_maps[0][n_fold_i].apply(dots[:, 0])
+        (j, on_sheet_j) = self.axis_maps[1][n_fold_j].apply(dots[:, 1])
+        return (i * self.extents[n_fold][1] + j, on_sheet_i & on_sheet_j)
+
+    def apply(self, dots: np.ndarray, n_fold: Optional[int] = None) -> np.ndarray:
+        # The distinct dots left after the first 'n_fold' folds (default: all)
+        n_fold = len(self) if (n_fold is None) else n_fold
+        (keys, on_sheet) = self._map(dots, n_fold)
+        keys = np.sort(keys[on_sheet])
+        keys = keys[np.append(True, keys[1:] != keys[:-1])] if len(keys) > 0 else keys
+        return np.stack(np.divmod(keys, self.extents[n_fold][1]), axis=1)
+
+    def dot_counts(self, dots: np.ndarray) -> np.ndarray:
+        # Number of distinct dots after 0, 1, 2, ... folds. Dots that meet
+        # stay together, so after each fold only one dot from each group is
+        # carried on to the next, and the groups shrink as the sheet does
+        counts = np.zeros((len(self) + 1,), dtype=np.int64)
+        survivors = np.arange(len(dots))
+        for n_fold in range(len(self) + 1):
+            (keys, on_sheet) = self._map(dots[survivors], n_fold)
+            survivors = survivors[on_sheet][_first_of_each(keys[on_sheet])]
+            counts[n_fold] = len(survivors)
+        return counts
+
+
+def fold_dots(dots: np.ndarray, folds: List[List[int]],
+              extent: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Folds a sheet of dots, stored as (i, j) coordinates, and returns the
+    # distinct dots that are left and the size of the folded sheet
+    dots = np.asarray(dots, dtype=np.int64)
+    plan = FoldPlan(folds, paper_extent(dots) if (extent is None) else extent)
+    return (plan.apply(dots), plan.extents[-1])
+
+
+def render_paper(dots: np.ndarray, extent: np.ndarray) -> np.ndarray:
+    paper = np.zeros(tuple(extent), dtype=bool)
+    paper[dots[:, 0], dots[:, 1]] = True
     return paper
 
 
-def solve_pt1(dots: List[List[int]], folds: List[List[int]]) -> int:
-    (max_i, max_j) = (-1, -1)
-    for (i, j) in dots:
-        max_i = max(i, max_i)
-        max_j = max(j, max_j)
-
-    paper = np.zeros((max_i + 1, max_j + 1), dtype=bool)
-    for (i, j) in dots:
-        paper[i, j] = True
-
-    # print_paper(paper)
-    paper = apply_folds(paper.copy(), folds[:1])
-    # print_paper(paper)
-    return paper.sum()
-
-
-def solve_pt2(dots: List[List[int]], folds: List[List[int]]) -> None:
-    (max_i, max_j) = (-1, -1)
-    for (i, j) in dots:
-        max_i = max(i, max_i)
-        max_j = max(j, max_j)
+def solve_pt1(dots: np.ndarray, folds: List[List[int]]) -> int:
+    (folded, _) = fold_dots(dots, folds[:1])
+    return len(folded)
 
-    paper = np.zeros((max_i + 1, max_j + 1), dtype=bool)
-    for (i, j) in dots:
-        paper[i, j] = True
 
-    paper = apply_folds(paper.copy(), folds)
+def solve_pt2(dots: np.ndarray, folds: List[List[int]]) -> None:
+    (folded, extent) = fold_dots(dots, folds)
     with np.printoptions(linewidth=120):
-        print_paper(paper)
+        print_paper(render_paper(folded, extent))
     return None
 
 
-def load_report(fpath: str) -> List[List[List[int]]]:
-    (dots, folds) = (None, None)
-    with open(fpath, "r") as f:
-        (dots, folds) = f.read().split("\n\n")
-    (dots, folds) = (dots.splitlines(), folds.splitlines())
-    dots = [list(map(int, d.split(","))) for d in dots]
-    dots = [(i, j) for (j, i) in dots]
-    folds = [f.split(" ")[2].split("=") for f in folds]
+def load_report(fpath: str) -> Tuple[np.ndarray, List[List[int]]]:
+    (dots, folds) = Path(fpath).read_bytes().split(b"\n\n")
+    # Dots are listed as x,y; stored as (i, j) = (y, x)
+    dots = parse_ints(np.frombuffer(dots, dtype=np.uint8))
+    if len(dots) % 2 != 0:
+        raise ValueError(f"ERROR: Incomplete dot coordinates in {fpath}")
+    dots = dots.reshape((-1, 2))[:, ::-1].copy()
+    folds = [f.split(" ")[2].split("=") for f in folds.decode("ascii").splitlines()]
     dir_map = {"x": 1, "y": 0}
     folds = [[dir_map[c], int(num)] for (c, num) in folds]
     return (dots, folds)
 
 
 def main() -> int:
-    (dots, folds) = load_report(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        (dots, folds) = load_report(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (17, None)
     print(f"Number of (dots, folds): {(len(dots), len(folds))}")
-    answer1 = solve_pt1(dots, folds)
-    answer2 = solve_pt2(dots, folds)
+    with measure("part1"):
+        answer1 = solve_pt1(dots, folds)
+    with measure("part2"):
+        answer2 = solve_pt2(dots, folds)
     print(f"Answer to Part 1: {answer1}")
     print(f"Answer to Part 2: {answer2}")
     assert answer1 == example_answer1
     assert answer2 == example_answer2
+    assert FoldPlan(folds, paper_extent(dots)).dot_counts(dots)[1] == example_answer1
 
     have_test_data = True
     if have_test_data:
-        (dots, folds) = load_report(TEST_DATA_PATH)
-        answer1 = solve_pt1(dots, folds)
-        answer2 = solve_pt2(dots, folds)
+        with measure("load"):
+            (dots, folds) = load_report(TEST_DATA_PATH)
+        with measure("part1"):
+            answer1 = solve_pt1(dots, folds)
+        with measure("part2"):
+            answer2 = solve_pt2(dots, folds)
         print(f"Answer to Part 1: {answer1}")
         print(f"Answer to Part 2: {answer2}")
 
@@ -1,10 +1,16 @@
+import sys
 from pathlib import Path
 from typing import List
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import count, measure  # noqa: E402
+from aoc.loaders import load_digit_grid  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
 STORED_RISKS = None
 SIZE = None
@@ -15,6 +21,7 @@ def risk(cavern: np.ndarray) -> int:
     stored_risks = -1 * np.ones((n_row, n_col), dtype=int)
     stored_risks[0, 0] = 0
 
+    count("relaxation sweeps")
     for i in range(n_row):
         for j in range(n_col):
             if (i == 0) and (j == 0):
@@ -28,6 +35,7 @@ def risk(cavern: np.ndarray) -> int:
 
     n_sweep = 2
     for _ in range(n_sweep):
+        count("relaxation sweeps")
         for i in range(n_row):
             for j in range(n_col):
                 if (i == 0) and (j == 0):
@@ -75,19 +83,18 @@ def solve_pt2(cavern: np.ndarray) -> int:
 
 
 def load_cavern(fpath: str) -> np.ndarray:
-    cavern = None
-    with open(fpath, "r") as f:
-        cavern = f.read().splitlines()
-    cavern = np.array([list(map(int, line)) for line in cavern])
-    return cavern
+    return load_digit_grid(fpath)
 
 
 def main() -> int:
-    example_cavern = load_cavern(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_cavern = load_cavern(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (40, 315)
     print(f"Number of entries in cavern: {len(example_cavern)}")
-    answer1 = solve_pt1(example_cavern)
-    answer2 = solve_pt2(example_cavern)
+    with measure("part1"):
+        answer1 = solve_pt1(example_cavern)
+    with measure("part2"):
+        answer2 = solve_pt2(example_cavern)
     print(f"Answer to Part 1: {answer1}")
     print(f"Answer to Part 2: {answer2}")
     assert answer1 == example_answer1
@@ -95,9 +102,12 @@ def main() -> int:
 
     have_test_data = True
     if have_test_data:
-        test_cavern = load_cavern(TEST_DATA_PATH)
-        answer1 = solve_pt1(test_cavern)
-        answer2 = solve_pt2(test_cavern)
+        with measure("load"):
+            test_cavern = load_cavern(TEST_DATA_PATH)
+        with measure("part1"):
+            answer1 = solve_pt1(test_cavern)
+        with measure("part2"):
+            answer2 = solve_pt2(test_cavern)
         print(f"Answer to Part 1: {answer1}")
         print(f"Answer to Part 2: {answer2}")
 
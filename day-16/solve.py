@@ -1,22 +1,28 @@
+import sys
 from pathlib import Path
 from typing import List, Union
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+
+
+DATA_DIR = Path(__file__).resolve().parent
 EXAMPLES = (
-    (Path.cwd() / "example-data11.dat", (6, None)),
-    (Path.cwd() / "example-data12.dat", (16, None)),
-    (Path.cwd() / "example-data13.dat", (12, None)),
-    (Path.cwd() / "example-data14.dat", (23, None)),
-    (Path.cwd() / "example-data15.dat", (31, None)),
-    (Path.cwd() / "example-data21.dat", (None, 3)),
-    (Path.cwd() / "example-data22.dat", (None, 54)),
-    (Path.cwd() / "example-data23.dat", (None, 7)),
-    (Path.cwd() / "example-data24.dat", (None, 9)),
-    (Path.cwd() / "example-data25.dat", (None, 1)),
-    (Path.cwd() / "example-data26.dat", (None, 0)),
-    (Path.cwd() / "example-data27.dat", (None, 0)),
-    (Path.cwd() / "example-data28.dat", (None, 1)),
+    (DATA_DIR / "example-data11.dat", (6, None)),
+    (DATA_DIR / "example-data12.dat", (16, None)),
+    (DATA_DIR / "example-data13.dat", (12, None)),
+    (DATA_DIR / "example-data14.dat", (23, None)),
+    (DATA_DIR / "example-data15.dat", (31, None)),
+    (DATA_DIR / "example-data21.dat", (None, 3)),
+    (DATA_DIR / "example-data22.dat", (None, 54)),
+    (DATA_DIR / "example-data23.dat", (None, 7)),
+    (DATA_DIR / "example-data24.dat", (None, 9)),
+    (DATA_DIR / "example-data25.dat", (None, 1)),
+    (DATA_DIR / "example-data26.dat", (None, 0)),
+    (DATA_DIR / "example-data27.dat", (None, 0)),
+    (DATA_DIR / "example-data28.dat", (None, 1)),
 )
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
 
 class PrettyPrinter(object):
@@ -206,21 +212,27 @@ def load_transmission(fpath: str) -> List[str]:
 
 def main() -> int:
     for (fname, (solution1, solution2)) in EXAMPLES:
-        transmission = load_transmission(fname)
+        with measure("load"):
+            transmission = load_transmission(fname)
         if solution1:
-            answer1 = solve_pt1(transmission)
+            with measure("part1"):
+                answer1 = solve_pt1(transmission)
             print(f"Answer to Part 1: {answer1}")
             assert answer1 == solution1
         if solution2:
-            answer2 = solve_pt2(transmission)
+            with measure("part2"):
+                answer2 = solve_pt2(transmission)
             print(f"Answer to Part 2: {answer2}")
             assert answer2 == solution2
 
     have_test_data = True
     if have_test_data:
-        transmission = load_transmission(TEST_DATA_PATH)
-        answer1 = solve_pt1(transmission)
-        answer2 = solve_pt2(transmission)
+        with measure("load"):
+            transmission = load_transmission(TEST_DATA_PATH)
+        with measure("part1"):
+            answer1 = solve_pt1(transmission)
+        with measure("part2"):
+            answer2 = solve_pt2(transmission)
         print(f"Answer to Part 1: {answer1}")
         print(f"Answer to Part 2: {answer2}")
 
@@ -1,12 +1,16 @@
 import re
+import sys
 from pathlib import Path
 from typing import Callable, List, Iterator
 import numpy as np
-from timing import timing
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import count, measure, timing  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data1.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data1.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
 
 class Scanner:
@@ -120,6 +124,7 @@ def solve_pt1(scanners: List[Scanner]) -> int:
         for i1 in scanners_connected_to_first_scanner:
             for i2 in scanners_not_found:
                 (s1, s2) = (scanners[i1], scanners[i2])
+                count("scanner pairs tried")
 
                 # Find matching beacons
                 (is_match, b_pos_rel_to_a, f) = Scanner.find_common_beacons(s1, s2)
@@ -182,7 +187,7 @@ def load_scanners(fpath: str) -> List[str]:
     with open(fpath, "r") as f:
         contents = f.read()
     contents = re.sub(r"\n\n", r"\n", contents)
-    scanners_data = re.split(r"--- scanner \d\d? ---\n", contents)[1:]
+    scanners_data = re.split(r"--- scanner \d+ ---\n", contents)[1:]
 
     scanners = []
     for scanner_data in scanners_data:
@@ -195,17 +200,22 @@ def load_scanners(fpath: str) -> List[str]:
 
 @timing
 def main() -> int:
-    transmission = load_scanners(EXAMPLE_DATA_PATH)
-    (answer1, _) = solve_pt1(transmission)
+    with measure("load"):
+        transmission = load_scanners(EXAMPLE_DATA_PATH)
+    with measure("part1"):
+        (answer1, _) = solve_pt1(transmission)
     print(f"Answer to Part 1: {answer1}")
     assert answer1 == 79
 
     have_test_data = True
     if have_test_data:
-        test_scanners = load_scanners(TEST_DATA_PATH)
+        with measure("load"):
+            test_scanners = load_scanners(TEST_DATA_PATH)
         (solution1, solution2) = (425, 13354)
-        (answer1, reoriented_scanners) = solve_pt1(test_scanners)
-        answer2 = solve_pt2(reoriented_scanners)
+        with measure("part1"):
+            (answer1, reoriented_scanners) = solve_pt1(test_scanners)
+        with measure("part2"):
+            answer2 = solve_pt2(reoriented_scanners)
         print(f"Answer to Part 1: {answer1}")
         print(f"Answer to Part 2: {answer2}")
         assert answer1 == solution1
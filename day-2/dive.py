@@ -1,48 +1,111 @@
+import os
+import sys
+from functools import reduce
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, Iterator, NamedTuple, Optional
+import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import NEWLINE, map_bytes, parse_ints  # noqa: E402
+from aoc.parallel import byte_ranges, map_ranges  # noqa: E402
 
-DATAFILE_PATH = Path.cwd() / "data.dat"
 
+DATA_DIR = Path(__file__).resolve().parent
+DATAFILE_PATH = DATA_DIR / "data.dat"
 
-def solve_pt1(commands: List[Tuple[str, int]]) -> int:
-    (h_pos, v_pos) = (0, 0)
-    for (command, size) in commands:
-        if command == "forward":
-            h_pos += size
-        if command == "down":
-            v_pos += size
-        if command == "up":
-            v_pos -= size
-    return h_pos * v_pos
+# Each command becomes one row of 'moves': (forward distance, change in aim)
+(FORWARD, DOWN, UP) = (ord("f"), ord("d"), ord("u"))
+COMMAND_LETTERS = b"forwarddownup"
+
+
+class Segment(NamedTuple):
+    # Net effect of a run of commands on a submarine that starts it with
+    # aim 0; the depth from part 1 is the same as the net aim
+    horizontal: int
+    depth: int
+    aim: int
+
+    def then(self, other: "Segment") -> "Segment":
+        # The second run's forward moves all happen with the first run's
+        # aim added on, which makes composing runs associative
+        return Segment(self.horizontal + other.horizontal,
+                       self.depth + other.depth + self.aim * other.horizontal,
+                       self.aim + other.aim)
+
+
+IDENTITY = Segment(0, 0, 0)
+
+
+def encode_commands(raw: np.ndarray) -> np.ndarray:
+    if len(raw) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    sizes = parse_ints(raw, ignore=COMMAND_LETTERS)
+    line_starts = np.append(0, np.flatnonzero(raw[:-1] == NEWLINE) + 1)
+    kinds = raw[line_starts]
+    kinds = kinds[(kinds == FORWARD) | (kinds == DOWN) | (kinds == UP)]
+    if len(kinds) != len(sizes):
+        raise ValueError("ERROR: Malformed command list")
+
+    moves = np.zeros((len(sizes), 2), dtype=np.int64)
+    moves[:, 0] = np.where(kinds == FORWARD, sizes, 0)
+    moves[:, 1] = np.where(kinds == DOWN, sizes, 0) - np.where(kinds == UP, sizes, 0)
+    return moves
+
+
+def summarise(moves: np.ndarray) -> Segment:
+    aim = np.cumsum(moves[:, 1])
+    return Segment(int(np.sum(moves[:, 0])),
+                   int(np.dot(moves[:, 0], aim)),
+                   int(aim[-1]) if len(aim) > 0 else 0)
 
 
-def solve_pt2(commands: List[Tuple[str, int]]) -> int:
-    (aim, h_pos, v_pos) = (0, 0, 0)
-    for (command, size) in commands:
-        if command == "down":
-            aim += size
-        if command == "up":
-            aim -= size
-        if command == "forward":
-            h_pos += size
-            v_pos += (size * aim)
+def _summarise_range(fpath: str, start: int, end: int) -> Segment:
+    return summarise(encode_commands(map_bytes(fpath)[start:end]))
+
+
+def summarise_parallel(fpath: str, n_worker: Optional[int] = None) -> Segment:
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    ranges = byte_ranges(fpath, min_chunks=n_worker)
+    return reduce(Segment.then, map_ranges(_summarise_range, fpath, ranges, n_worker), IDENTITY)
+
+
+def iter_moves(fpath: str) -> Iterator[np.ndarray]:
+    raw = map_bytes(fpath)
+    for (start, end) in byte_ranges(fpath):
+        yield encode_commands(raw[start:end])
+
+
+def summarise_stream(chunks: Iterable[np.ndarray]) -> Segment:
+    # Only the running state is kept between chunks of moves
+    return reduce(Segment.then, map(summarise, chunks), IDENTITY)
+
+
+def solve_pt1(moves: np.ndarray) -> int:
+    (h_pos, v_pos) = (int(np.sum(moves[:, 0])), int(np.sum(moves[:, 1])))
     return h_pos * v_pos
 
 
-def load_commands() -> List[Tuple[str, int]]:
-    commands = None
-    with open(DATAFILE_PATH, "r") as f:
-        commands = f.readlines()
-    commands = list((s.split()[0], int(s.split()[1])) for s in commands)
-    return commands
+def solve_pt2(moves: np.ndarray) -> int:
+    segment = summarise(moves)
+    return segment.horizontal * segment.depth
+
+
+def load_commands(fpath: str = DATAFILE_PATH) -> np.ndarray:
+    return encode_commands(map_bytes(fpath))
 
 
 def main() -> int:
-    commands = load_commands()
-    print(f"Number of commands: {len(commands)}")
-    print(f"Answer to Part 1: {solve_pt1(commands)}")
-    print(f"Answer to Part 2: {solve_pt2(commands)}")
+    with measure("load"):
+        moves = load_commands()
+    print(f"Number of commands: {len(moves)}")
+    with measure("part1"):
+        answer1 = solve_pt1(moves)
+    with measure("part2"):
+        answer2 = solve_pt2(moves)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":
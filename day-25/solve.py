@@ -1,10 +1,15 @@
+import sys
 from pathlib import Path
 from typing import List
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
 
 class Grid:
@@ -98,11 +103,14 @@ def load_state(fpath: str) -> List[str]:
 
 
 def main() -> int:
-    example_state = load_state(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_state = load_state(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (58, None)
     print(f"Number of entries in state: {len(example_state)}")
-    answer1 = solve_pt1(example_state)
-    answer2 = solve_pt2(example_state)
+    with measure("part1"):
+        answer1 = solve_pt1(example_state)
+    with measure("part2"):
+        answer2 = solve_pt2(example_state)
     print(f"Answer to Part 1: {answer1}")
     print(f"Answer to Part 2: {answer2}")
     assert answer1 == example_answer1
@@ -110,9 +118,12 @@ def main() -> int:
 
     have_test_data = True
     if have_test_data:
-        test_state = load_state(TEST_DATA_PATH)
-        answer1 = solve_pt1(test_state)
-        answer2 = solve_pt2(test_state)
+        with measure("load"):
+            test_state = load_state(TEST_DATA_PATH)
+        with measure("part1"):
+            answer1 = solve_pt1(test_state)
+        with measure("part2"):
+            answer2 = solve_pt2(test_state)
         print(f"Answer to Part 1: {answer1}")
         print(f"Answer to Part 2: {answer2}")
 
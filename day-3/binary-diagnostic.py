@@ -1,79 +1,157 @@
+import sys
+from bisect import bisect_left
 from pathlib import Path
-from typing import List
+from typing import NamedTuple
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import load_digit_grid  # noqa: E402
+
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
+
+MAX_PACKED_BITWIDTH = 64
+# Bits of every byte value, most significant first
+BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).astype(np.int64)
+
+
+class Report(NamedTuple):
+    # Codes up to 64 bits wide are stored as one uint64 each; wider codes as
+    # rows of a big-endian bit-packed uint8 matrix (see np.packbits)
+    codes: np.ndarray
+    bitwidth: int
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def one_counts(self) -> np.ndarray:
+        # Histogram each byte column once; the ones in each bit position are
+        # then a dot product of the histogram with the bits of all 256 bytes
+        if self.codes.ndim == 1:
+            byte_matrix = self.codes.astype(">u8").view(np.uint8).reshape(-1, 8)
+            first_bit = MAX_PACKED_BITWIDTH - self.bitwidth
+        else:
+            (byte_matrix, first_bit) = (self.codes, 0)
+        counts = [np.bincount(byte_matrix[:, j], minlength=256) @ BYTE_BITS
+                  for j in range(byte_matrix.shape[1])]
+        return np.concatenate(counts)[first_bit:first_bit + self.bitwidth]
+
+    def code(self, index: int) -> int:
+        if self.codes.ndim == 1:
+            return int(self.codes[index])
+        n_pad = 8 * self.codes.shape[1] - self.bitwidth
+        return int.from_bytes(self.codes[index].tobytes(), "big") >> n_pad
+
+    def bit(self, row: int, index: int) -> int:
+        if self.codes.ndim == 1:
+            return (int(self.codes[row]) >> (self.bitwidth - 1 - index)) & 1
+        (byte, bit) = divmod(index, 8)
+        return (int(self.codes[row, byte]) >> (7 - bit)) & 1
+
+    def sorted(self) -> "Report":
+        if self.codes.ndim == 1:
+            return Report(np.sort(self.codes), self.bitwidth)
+        # Big-endian rows compared bytewise sort in numeric order
+        n_byte = self.codes.shape[1]
+        rows = np.sort(np.ascontiguousarray(self.codes).view(f"V{n_byte}").ravel())
+        return Report(rows.view(np.uint8).reshape(-1, n_byte), self.bitwidth)
+
+
+class RatingIndex:
+    # Once the report is sorted, the codes that share a prefix form one
+    # contiguous range, and within it the next bit is 0 for a leading run and
+    # 1 for the rest, so each filtering step is a binary search for the split
+    def __init__(self, report: Report):
+        self.report = report.sorted()
+
+    def _first_one(self, lo: int, hi: int, index: int) -> int:
+        return bisect_left(range(lo, hi), 1, key=lambda row: self.report.bit(row, index)) + lo
+
+    def rating(self, criteria: str) -> int:
+        (lo, hi) = (0, len(self.report))
+        (index, bitwidth) = (0, self.report.bitwidth)
+        while (hi - lo > 1) and (index < bitwidth):
+            split = self._first_one(lo, hi, index)
+            (n_zero, n_one) = (split - lo, hi - split)
+            if criteria == "most common":
+                keep_ones = (n_one >= n_zero)
+            if criteria == "least common":
+                keep_ones = not (n_zero <= n_one)
+            (lo, hi) = (split, hi) if keep_ones else (lo, split)
+            index += 1
+        assert hi - lo == 1
+        return self.report.code(lo)
 
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+def pack_bits(bits: np.ndarray) -> Report:
+    (n_entry, bitwidth) = bits.shape
+    packed = np.packbits(bits, axis=1)
+    if bitwidth > MAX_PACKED_BITWIDTH:
+        return Report(packed, bitwidth)
 
+    # Read each packed row as the leading bytes of a big-endian uint64, then
+    # shift out the zero bits that pad it to 64
+    as_bytes = np.zeros((n_entry, 8), dtype=np.uint8)
+    as_bytes[:, :packed.shape[1]] = packed
+    codes = as_bytes.view(">u8").ravel().astype(np.uint64)
+    return Report(codes >> np.uint64(MAX_PACKED_BITWIDTH - bitwidth), bitwidth)
 
-def solve_pt1(report: List[str]) -> int:
-    n_entry = len(report)
-    bitwidth = len(report[0])
 
-    one_counts = [0] * bitwidth
-    for string in report:
-        for i, c in enumerate(string):
-            one_counts[i] += (1 if (int(c) == 1) else 0)
+def solve_pt1(report: Report) -> int:
+    n_entry = len(report)
+    bitwidth = report.bitwidth
 
-    gamma = [None] * bitwidth
-    for i in range(len(gamma)):
-        gamma[i] = ("1" if ((2 * one_counts[i]) > n_entry) else "0")
-    gamma = "".join(gamma)
-    gamma = int(gamma, base=2)
+    gamma = 0
+    for count in report.one_counts():
+        gamma = (gamma << 1) | int((2 * count) > n_entry)
 
     epsilon = (2 ** bitwidth) - 1 - gamma
     return gamma * epsilon
 
 
-def solve_pt2(report_in: List[str]) -> int:
-
-    def calculate_rating(report_in: List[str], criteria: str) -> str:
-        report = report_in.copy()
-        (index, bitwidth) = (0, len(report[0]))
-        while (len(report) > 1) and (index < bitwidth):
-            n_entry = len(report)
-            n_one = sum([int(string[index]) for string in report])
-            n_zero = n_entry - n_one
-            if criteria == "most common":
-                filter_value = str(1 if (n_one >= n_zero) else 0)
-            if criteria == "least common":
-                filter_value = str(0 if (n_zero <= n_one) else 1)
-            report = list(filter(lambda s: s[index] == filter_value, report))
-            index += 1
-        assert len(report) == 1
-        return int(report[0], 2)
-
-    report = report_in.copy()
-    (oxy_rating, co2_rating) = (0, 0)
-    oxy_rating = calculate_rating(report, criteria="most common")
-    co2_rating = calculate_rating(report, criteria="least common")
+def solve_pt2(report: Report) -> int:
+    ratings = RatingIndex(report)
+    oxy_rating = ratings.rating(criteria="most common")
+    co2_rating = ratings.rating(criteria="least common")
     return oxy_rating * co2_rating
 
 
-def load_report(fpath: str) -> List[str]:
-    report = None
-    with open(fpath, "r") as f:
-        report = f.readlines()
-    report = list(map(lambda x: x.rstrip("\n"), report))
-    return report
+def load_report(fpath: str) -> Report:
+    bits = load_digit_grid(fpath)
+    if np.any(bits > 1):
+        raise ValueError(f"ERROR: Non-binary digit in report {fpath}")
+    return pack_bits(bits)
 
 
 def main() -> int:
-    example_report = load_report(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_report = load_report(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (198, 230)
     print(f"Number of entries in report: {len(example_report)}")
-    print(f"Answer to Part 1: {solve_pt1(example_report)}")
-    print(f"Answer to Part 2: {solve_pt2(example_report)}")
-    assert solve_pt1(example_report) == example_answer1
-    assert solve_pt2(example_report) == example_answer2
-
-    test_report = load_report(TEST_DATA_PATH)
+    with measure("part1"):
+        answer1 = solve_pt1(example_report)
+    with measure("part2"):
+        answer2 = solve_pt2(example_report)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
+    assert answer1 == example_answer1
+    assert answer2 == example_answer2
+
+    with measure("load"):
+        test_report = load_report(TEST_DATA_PATH)
     print(f"Number of entries in report: {len(test_report)}")
-    print(f"Answer to Part 1: {solve_pt1(test_report)}")
-    print(f"Answer to Part 2: {solve_pt2(test_report)}")
+    with measure("part1"):
+        answer1 = solve_pt1(test_report)
+    with measure("part2"):
+        answer2 = solve_pt2(test_report)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
     (test_answer1, test_answer2) = (693486, 3379326)
-    assert solve_pt1(test_report) == test_answer1
-    assert solve_pt2(test_report) == test_answer2
+    assert answer1 == test_answer1
+    assert answer2 == test_answer2
 
 
 if __name__ == "__main__":
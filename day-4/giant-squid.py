@@ -1,129 +1,185 @@
+import sys
 from pathlib import Path
-from typing import List, Tuple
-from copy import deepcopy
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
 import numpy as np
-import re
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import NEWLINE, map_bytes, parse_ints  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
+
+BOARD_SHAPE = (5, 5)
+BOARD_SIZE = BOARD_SHAPE[0] * BOARD_SHAPE[1]
+
+
+class Wins(NamedTuple):
+    # Boards in the order they win (ties broken by board index) and the
+    # score of each at the moment it wins
+    boards: np.ndarray
+    turns: np.ndarray
+    scores: np.ndarray
 
 
 class BingoTable:
-    def __init__(self, data: List[int]):
-        assert len(data) == 25
-        self._table = np.array(data).reshape((5, 5))
-        self._crossed_boxes = np.zeros((5, 5), dtype=bool)
-        self._winning_number = None
-        self._have_bingo = False
+    # Every board in the game stacked into one (n_board, 5, 5) array
+    def __init__(self, boards: np.ndarray):
+        self._boards = np.asarray(boards, dtype=np.int64).reshape((-1, *BOARD_SHAPE))
 
     def __str__(self) -> str:
-        return "\nValues:\n" + str(self._table) + "\nMarked:\n" + str(self._crossed_boxes)
+        return "\nBoards:\n" + str(self._boards)
 
     def __repr__(self) -> str:
         return str(self)
 
-    def check_bingo(self) -> bool:
-        bingo = False
-        for row in range(5):
-            bingo |= np.all(self._crossed_boxes[row, :])
-        for col in range(5):
-            bingo |= np.all(self._crossed_boxes[:, col])
-        self._have_bingo = bingo
-        return bingo
-
-    def mark(self, value: int) -> bool:
-        have_bingo = self.check_bingo()
-        if not self._have_bingo:
-            self._crossed_boxes |= (self._table == value)
-            have_bingo = self.check_bingo()
-            if have_bingo:
-                self._winning_number = value
-        return have_bingo
-
-    def clear(self) -> bool:
-        self._crossed_boxes ^= self._crossed_boxes
-        self._have_bingo = False
-
-    def calculate_winning_score(self) -> int:
-        unmarked_numbers_sum = np.sum(self._table * ~self._crossed_boxes)
-        return self._winning_number * unmarked_numbers_sum
-
-
-def solve_pt1(drawn_numbers: List[int], tables: List[BingoTable]) -> int:
-    finished = False
-    for value in drawn_numbers:
-        for table in tables:
-            finished = table.mark(value)
-            if finished:
-                return table.calculate_winning_score()
-    return None
-
-
-def solve_pt2(drawn_numbers: List[int], tables: List[BingoTable]) -> int:
-    order_of_wins = []
-    for value in drawn_numbers:
-        for index, table in enumerate(tables):
-            finished = table.mark(value)
-            if finished and index not in order_of_wins:
-                order_of_wins.append(index)
-    last_win = order_of_wins[-1]
-    return tables[last_win].calculate_winning_score()
-
-
-def load(fpath: str) -> Tuple[List[int], List[BingoTable]]:
-    squeeze_spaces = (lambda s : re.sub(' +', ' ', s))
-
-    with open(fpath, "r") as f:
-        data = f.readlines()
-
-    def string_to_table(table_as_str: str) -> BingoTable:
-        table_as_str = table_as_str.replace("\n", " ")
-        table_as_str = squeeze_spaces(table_as_str).strip()
-        table_as_str = table_as_str.split()
-        table = list(map(int, table_as_str))
-        return BingoTable(table)
-
-    [drawn_numbers, data] = [list(map(int, data[0].split(","))), data[1:]]
-
-    tables = []
-    n_table = len(data) // 6
-    for _ in range(n_table):
-        table = ""
-
-        # Skip empty line
-        data = data[1:]
-
-        # Read table
-        table = string_to_table(" ".join(data[:5]))
-        tables.append(table)
-        data = data[5:]
-
-    return [drawn_numbers, tables]
+    def __len__(self) -> int:
+        return len(self._boards)
+
+    @property
+    def boards(self) -> np.ndarray:
+        return self._boards
+
+    def cell_turns(self, drawn_numbers: np.ndarray) -> np.ndarray:
+        # Turn on which each cell gets marked; cells that are never drawn get
+        # 'len(drawn_numbers)'. A number drawn more than once counts from
+        # its first draw
+        n_draw = len(drawn_numbers)
+        size = 1 + max(int(self._boards.max(initial=0)), int(drawn_numbers.max(initial=0)))
+        draw_turn = np.full((size,), n_draw, dtype=np.int64)
+        (numbers, first_turns) = np.unique(drawn_numbers, return_index=True)
+        draw_turn[numbers] = first_turns
+        return draw_turn[self._boards]
+
+    def play(self, drawn_numbers: np.ndarray) -> Wins:
+        cell_turns = self.cell_turns(drawn_numbers)
+        # A line is complete once its last cell is marked, and a board wins
+        # with its first complete line
+        win_turns = np.minimum(cell_turns.max(axis=2).min(axis=1),
+                               cell_turns.max(axis=1).min(axis=1))
+
+        winners = np.flatnonzero(win_turns < len(drawn_numbers))
+        winners = winners[np.argsort(win_turns[winners], kind="stable")]
+        turns = win_turns[winners]
+        unmarked = cell_turns[winners] > turns[:, np.newaxis, np.newaxis]
+        unmarked_sums = np.sum(self._boards[winners] * unmarked, axis=(1, 2))
+        return Wins(winners, turns, drawn_numbers[turns] * unmarked_sums)
+
+
+class Win(NamedTuple):
+    board: int
+    turn: int
+    score: int
+
+
+class BingoSession:
+    # Plays a game one drawn number at a time. Each number is looked up in
+    # an index of the cells it appears in, so a draw only touches the boards
+    # containing it rather than every board in the table
+    def __init__(self, table: BingoTable):
+        boards = table.boards
+        values = boards.reshape(-1)
+        self._cells = np.argsort(values, kind="stable")
+        self._values = values[self._cells]
+
+        n_board = len(table)
+        self._row_hits = np.zeros((n_board, BOARD_SHAPE[0]), dtype=np.int8)
+        self._col_hits = np.zeros((n_board, BOARD_SHAPE[1]), dtype=np.int8)
+        self._marked = np.zeros((len(values),), dtype=bool)
+        self._unmarked_sums = boards.sum(axis=(1, 2))
+        self._won = np.zeros((n_board,), dtype=bool)
+        self.turn = 0
+        self.wins: List[Win] = []
+
+    def _cells_with(self, value: int) -> np.ndarray:
+        (start, end) = np.searchsorted(self._values, [value, value + 1])
+        return self._cells[start:end]
+
+    def draw(self, value: int) -> List[Win]:
+        cells = self._cells_with(value)
+        (boards, offsets) = np.divmod(cells, BOARD_SIZE)
+        keep = ~self._marked[cells] & ~self._won[boards]
+        (cells, boards, offsets) = (cells[keep], boards[keep], offsets[keep])
+        (rows, cols) = np.divmod(offsets, BOARD_SHAPE[1])
+
+        self._marked[cells] = True
+        np.add.at(self._row_hits, (boards, rows), 1)
+        np.add.at(self._col_hits, (boards, cols), 1)
+        np.subtract.at(self._unmarked_sums, boards, value)
+
+        complete = ((self._row_hits[boards, rows] == BOARD_SHAPE[1])
+                    | (self._col_hits[boards, cols] == BOARD_SHAPE[0]))
+        winners = np.unique(boards[complete])
+        self._won[winners] = True
+
+        new_wins = [Win(int(board), self.turn, value * int(self._unmarked_sums[board]))
+                    for board in winners]
+        self.wins += new_wins
+        self.turn += 1
+        return new_wins
+
+    def feed(self, drawn_numbers: Iterable[int]) -> Iterator[Win]:
+        for value in drawn_numbers:
+            yield from self.draw(int(value))
+
+
+def solve_pt1(drawn_numbers: np.ndarray, tables: BingoTable) -> Tuple[int, Wins]:
+    # Every board is played out at once, so part 2 reuses the same result
+    wins = tables.play(drawn_numbers)
+    if len(wins.boards) == 0:
+        return (None, wins)
+    return (int(wins.scores[0]), wins)
+
+
+def solve_pt2(wins: Wins) -> int:
+    if len(wins.boards) == 0:
+        return None
+    return int(wins.scores[-1])
+
+
+def load(fpath: str) -> Tuple[np.ndarray, BingoTable]:
+    raw = map_bytes(fpath)
+    is_newline = (raw == NEWLINE)
+    first_line_end = int(np.argmax(is_newline)) if np.any(is_newline) else len(raw)
+
+    drawn_numbers = parse_ints(raw[:first_line_end])
+    values = parse_ints(raw[first_line_end:])
+    if len(values) % (BOARD_SHAPE[0] * BOARD_SHAPE[1]) != 0:
+        raise ValueError(f"ERROR: Incomplete bingo board in {fpath}")
+    return (drawn_numbers, BingoTable(values))
 
 
 def main() -> int:
     # EXAMPLE DATA
 
-    [drawn_numbers, tables] = load(EXAMPLE_DATA_PATH)
-    (tables1, tables2) = (tables, deepcopy(tables))
+    with measure("load"):
+        (drawn_numbers, tables) = load(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (4512, 1924)
     print(f"Number of drawn numbers: {len(drawn_numbers)}")
-    print(f"Number of tables: {len(tables1)}")
-    answer1 = solve_pt1(drawn_numbers, tables1)
-    answer2 = solve_pt2(drawn_numbers, tables2)
+    print(f"Number of tables: {len(tables)}")
+    with measure("part1"):
+        (answer1, wins) = solve_pt1(drawn_numbers, tables)
+    with measure("part2"):
+        answer2 = solve_pt2(wins)
     print(f"Answer to Part 1: {answer1}")
     print(f"Answer to Part 2: {answer2}")
     assert answer1 == example_answer1
     assert answer2 == example_answer2
 
+    streamed_wins = list(BingoSession(tables).feed(drawn_numbers))
+    assert [win.score for win in streamed_wins] == wins.scores.tolist()
+
     # TEST DATA
 
-    [drawn_numbers, tables] = load(TEST_DATA_PATH)
-    (tables1, tables2) = (tables, deepcopy(tables))
+    with measure("load"):
+        (drawn_numbers, tables) = load(TEST_DATA_PATH)
     print(f"Number of drawn numbers: {len(drawn_numbers)}")
-    print(f"Number of tables: {len(tables1)}")
-    answer1 = solve_pt1(drawn_numbers, tables1)
-    answer2 = solve_pt2(drawn_numbers, tables2)
+    print(f"Number of tables: {len(tables)}")
+    with measure("part1"):
+        (answer1, wins) = solve_pt1(drawn_numbers, tables)
+    with measure("part2"):
+        answer2 = solve_pt2(wins)
     print(f"Answer to Part 1: {answer1}")
     print(f"Answer to Part 2: {answer2}")
 
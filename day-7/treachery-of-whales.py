@@ -1,76 +1,131 @@
+import sys
 from pathlib import Path
-from typing import Callable, List
+from typing import Callable, NamedTuple, Tuple, Union
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import load_ints  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
 
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
 
-def solve_pt1(positions: List[int]) -> int:
-    def cost(x: np.ndarray, x_p: int):
-        return np.sum(np.abs(x - x_p))
-    x_min = round(np.median(positions))
-    return cost(positions, x_min)
 
+class AlignmentCosts(NamedTuple):
+    # Total fuel to align every crab at each position from the leftmost to
+    # the rightmost crab; the best position always lies in that range
+    linear: np.ndarray
+    triangular: np.ndarray
 
-def newton_raphson(f: Callable) -> int:
-    (x, n_iter, dx) = (5, 1000, 1.0e-04)
-    for _ in range(n_iter):
-        fx = f(x)
-        df_dx = (f(x + dx) - fx) / dx
-        update = (fx / df_dx)
-        if df_dx == 0:
-            break
-        x -= update
-    return x
 
+def position_histogram(positions: np.ndarray) -> Tuple[int, np.ndarray]:
+    x_min = int(np.min(positions))
+    return (x_min, np.bincount(positions - x_min))
 
-def solve_pt2(positions: List[int]) -> int:
-    def cost(x: np.ndarray, x_p: int) -> int:
-        dists = np.abs(x_p - x)
-        costs = (dists * (dists + 1)) / 2
-        return int(np.sum(costs))
 
-    def dcost_dx_p(x: np.ndarray, x_p: int):
-        dc_dx_p = 0.0
-        for i in range(len(x)):
-            dc_dx_p += np.sign((x_p - x[i]) *
-                               (x_p - x[i] + 1)) * (2*x_p - 2*x[i] + 1)
-        dc_dx_p /= 2.0
-        return dc_dx_p
+def alignment_costs(positions: np.ndarray) -> AlignmentCosts:
+    (_, counts) = position_histogram(positions)
+    x = np.arange(len(counts), dtype=np.int64)
 
-    # Returns the floating-point minimum
-    x_p = newton_raphson(lambda x_pos: dcost_dx_p(positions, x_pos))
+    # Number of crabs at or left of each position, and the sum of their positions
+    n_left = np.cumsum(counts)
+    x_sum_left = np.cumsum(counts * x)
+    (n_crab, x_sum) = (n_left[-1], x_sum_left[-1])
 
-    # Check the cost for each integer position either side of the minimum; take
-    # the position that leads to the smallest cost
-    x_range = (int(np.floor(x_p)), int(np.ceil(x_p)))
-    costs = list(map(lambda x: cost(positions, x), x_range))
-    fuel = min(costs)
-    return fuel
+    # sum(|x_i - x|) split into the crabs either side of x
+    linear = (x * n_left - x_sum_left) + ((x_sum - x_sum_left) - x * (n_crab - n_left))
 
+    # A move of d costs d * (d + 1) / 2, i.e. (d^2 + d) / 2, and sum((x_i - x)^2)
+    # expands into sums over the histogram that don't depend on x
+    x_sq_sum = np.sum(counts * x * x)
+    squared = x_sq_sum - 2 * x * x_sum + n_crab * x * x
+    return AlignmentCosts(linear, (squared + linear) // 2)
 
-def load_positions(fpath: str) -> List[int]:
-    positions = None
-    with open(fpath, "r") as f:
-        positions = f.readline()
-    return np.array(list(map(int, positions.split(","))))
+
+# Fuel to move one crab a distance 'd', as vectorised functions of an array
+# of distances. 'CrabSwarm.align' relies on the total being convex, which
+# holds when the cost is a convex function of distance (so not e.g. sqrt)
+COST_MODELS = {
+    "linear": lambda d: d,
+    "triangular": lambda d: d * (d + 1) // 2,
+    "quadratic": lambda d: d * d,
+}
+
+
+class CrabSwarm:
+    # Positions are reduced once to the occupied positions and their crab
+    # counts; every cost model is then evaluated against that histogram.
+    # Only occupied positions are counted, so crabs spread far apart don't
+    # need a bin for every position in between
+    def __init__(self, positions: np.ndarray):
+        (self.positions, self.counts) = np.unique(positions, return_counts=True)
+
+    def total_costs(self, cost: Callable, targets: np.ndarray) -> np.ndarray:
+        # Fuel to align the swarm at each target, all targets in one reduction
+        dists = np.abs(self.positions[np.newaxis, :] - targets[:, np.newaxis])
+        return np.sum(self.counts * cost(dists), axis=1)
+
+    def align(self, cost: Union[str, Callable], n_probe: int = 16) -> Tuple[int, float]:
+        # Search the convex total cost by evaluating 'n_probe' evenly spaced
+        # targets at once; the minimum lies between the neighbours of the
+        # cheapest probe, so each round shrinks the range ~n_probe/2 times
+        if n_probe < 4:
+            raise ValueError("ERROR: Need at least 4 probes to narrow the search")
+        if isinstance(cost, str):
+            cost = COST_MODELS[cost]
+        (lo, hi) = (int(self.positions[0]), int(self.positions[-1]))
+        while hi - lo + 1 > n_probe:
+            probes = np.unique(np.linspace(lo, hi, n_probe).round().astype(np.int64))
+            best = int(np.argmin(self.total_costs(cost, probes)))
+            (lo, hi) = (int(probes[max(best - 1, 0)]), int(probes[min(best + 1, len(probes) - 1)]))
+
+        targets = np.arange(lo, hi + 1)
+        costs = self.total_costs(cost, targets)
+        best = int(np.argmin(costs))
+        return (int(targets[best]), costs[best].item())
+
+
+def solve_pt1(positions: np.ndarray) -> int:
+    return int(np.min(alignment_costs(positions).linear))
+
+
+def solve_pt2(positions: np.ndarray) -> int:
+    return int(np.min(alignment_costs(positions).triangular))
+
+
+def load_positions(fpath: str) -> np.ndarray:
+    return load_ints(fpath)
 
 
 def main() -> int:
-    example_positions = load_positions(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_positions = load_positions(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (37, 168)
     print(f"Number of entries in positions: {len(example_positions)}")
-    print(f"Answer to Part 1: {solve_pt1(example_positions)}")
-    print(f"Answer to Part 2: {solve_pt2(example_positions)}")
-    assert solve_pt1(example_positions) == example_answer1
-    assert solve_pt2(example_positions) == example_answer2
-
-    test_positions = load_positions(TEST_DATA_PATH)
+    with measure("part1"):
+        answer1 = solve_pt1(example_positions)
+    with measure("part2"):
+        answer2 = solve_pt2(example_positions)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
+    assert answer1 == example_answer1
+    assert answer2 == example_answer2
+
+    swarm = CrabSwarm(example_positions)
+    assert swarm.align("linear") == (2, example_answer1)
+    assert swarm.align("triangular") == (5, example_answer2)
+
+    with measure("load"):
+        test_positions = load_positions(TEST_DATA_PATH)
     print(f"Number of entries in positions: {len(test_positions)}")
-    print(f"Answer to Part 1: {solve_pt1(test_positions)}")
-    print(f"Answer to Part 2: {solve_pt2(test_positions)}")
+    with measure("part1"):
+        answer1 = solve_pt1(test_positions)
+    with measure("part2"):
+        answer2 = solve_pt2(test_positions)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":
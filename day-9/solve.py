@@ -1,112 +1,217 @@
+import heapq
+import sys
 from pathlib import Path
-from typing import List
-from itertools import product
+from typing import List, NamedTuple
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from aoc.instrument import measure  # noqa: E402
+from aoc.loaders import ZERO, load_digit_grid, map_digit_grid  # noqa: E402
 
-EXAMPLE_DATA_PATH = Path.cwd() / "example-data.dat"
-TEST_DATA_PATH = Path.cwd() / "test-data.dat"
+
+DATA_DIR = Path(__file__).resolve().parent
+EXAMPLE_DATA_PATH = DATA_DIR / "example-data.dat"
+TEST_DATA_PATH = DATA_DIR / "test-data.dat"
+# Number of largest basins whose sizes are multiplied together
+N_LARGEST = 3
 
 
 class HeightMap:
-    def __init__(self, grid: List[List[int]]):
+    def __init__(self, grid: np.ndarray):
         self.grid = np.array(grid)
         self.size = self.grid.shape
 
     def _low_points(self) -> np.ndarray:
-        int32_max = np.iinfo(np.int32).max
-        temp_grid = np.pad(self.grid, 1, constant_values=int32_max)
-        low_points = np.ones(temp_grid.shape, dtype=bool)
-
-        for (di, dj) in ((0, -1), (0, 1), (-1, 0), (1, 0)):
-            low_points &= temp_grid < np.roll(
-                temp_grid, (di, dj), axis=(0, 1))
-
-        # Strip padding
-        return low_points[1:-1, 1:-1]
+        pad_value = np.iinfo(self.grid.dtype).max
+        return low_points(np.pad(self.grid, 1, constant_values=pad_value))
 
     def risk_level(self) -> int:
         is_low_point = self._low_points()
         return np.sum(self.grid[is_low_point] + 1)
 
+    def basin_labels(self) -> np.ndarray:
+        # Basins are the connected regions of cells below 9; 9s get label -1
+        return label_basins(self.grid < 9)
+
+    def basin_sizes(self) -> np.ndarray:
+        labels = self.basin_labels()
+        return np.bincount(labels[labels >= 0])
+
     def get_largest_basin_size(self) -> int:
-        max_basin_size = 0
-        low_points = self._low_points()
-        zero_mask = np.zeros(low_points.shape, dtype=bool)
-
-        n_low_point = np.sum(self._low_points())
-        basin_sizes = np.zeros((n_low_point,))
-
-        (lp_i, lp_j) = np.where(low_points)
-        for (index, (i, j)) in enumerate(zip(lp_i, lp_j)):
-            low_point_mask = zero_mask.copy()
-            low_point_mask[i, j] = True
-            basin_sizes[index] = self._get_basin_size(low_point_mask)
-        basin_sizes = np.sort(basin_sizes)[-3:]
-
-        return int(basin_sizes[0] * basin_sizes[1] * basin_sizes[2])
-
-    def _valid_ij(self, i: int, j: int) -> bool:
-        return (i >= 0) & (i < self.size[0]) & (j >= 0) & (j < self.size[1])
-
-    def _get_basin_size(self, basin_mask: np.ndarray) -> int:
-        new_points = basin_mask
-        previously_found = (basin_mask * 0).astype(bool)
-        while np.sum(new_points) > 0:
-            new_points = basin_mask ^ previously_found
-            previously_found = basin_mask.copy()
-            if np.sum(basin_mask) == (self.size[0] * self.size[1]):
-                break
-
-            (lp_i, lp_j) = np.where(new_points)
-
-            for (i, j) in zip(lp_i, lp_j):
-                for (di, dj) in ((0, -1), (0, 1), (-1, 0), (1, 0)):
-                    if self._valid_ij(i + di, j + dj):
-                        # Not marked yet
-                        if not basin_mask[i + di, j + dj]:
-                            # Not a 9
-                            if self.grid[i + di, j + dj] != 9:
-                                # Higher than current point
-                                if self.grid[i, j] < self.grid[i + di, j + dj]:
-                                    basin_mask[i + di, j + dj] = True
-
-            if np.sum(previously_found ^ basin_mask) == 0:
-                break
-        result = np.sum(basin_mask)
-        return result
-
-
-def solve_pt1(data: List[str]) -> int:
+        basin_sizes = np.sort(self.basin_sizes())[-N_LARGEST:]
+        return int(np.prod(basin_sizes))
+
+
+class MapSummary(NamedTuple):
+    # Only the sizes of the 'N_LARGEST' largest basins are kept
+    risk_level: int
+    basin_sizes: np.ndarray
+
+    def get_largest_basin_size(self) -> int:
+        return int(np.prod(np.sort(self.basin_sizes)[-N_LARGEST:]))
+
+
+def low_points(padded: np.ndarray) -> np.ndarray:
+    # Low points of the interior of a grid with a one-cell border around it
+    interior = padded[1:-1, 1:-1]
+    return ((interior < padded[:-2, 1:-1]) & (interior < padded[2:, 1:-1])
+            & (interior < padded[1:-1, :-2]) & (interior < padded[1:-1, 2:]))
+
+
+def find_roots(parent: np.ndarray) -> np.ndarray:
+    # Point every node straight at its root by repeated pointer jumping
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def union_edges(parent: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    # Union-find over a whole array of edges at once: each round hooks every
+    # root onto the smallest root it shares an edge with, then flattens the
+    # trees again. Roots are only ever hooked onto smaller labels, so no
+    # cycles can form, and a root with many neighbours merges with all of
+    # them within two rounds rather than one per round
+    parent = find_roots(parent)
+    while True:
+        (root_u, root_v) = (parent[u], parent[v])
+        spanning = (root_u != root_v)
+        if not np.any(spanning):
+            return parent
+        (u, v, root_u, root_v) = (u[spanning], v[spanning], root_u[spanning], root_v[spanning])
+        np.minimum.at(parent, np.maximum(root_u, root_v), np.minimum(root_u, root_v))
+        parent = find_roots(parent)
+
+
+def label_basins(in_basin: np.ndarray) -> np.ndarray:
+    # Each horizontal run of basin cells is already connected, so label runs
+    # first and only union runs that touch across neighbouring rows
+    (n_row, n_col) = in_basin.shape
+    run_start = in_basin.copy()
+    run_start[:, 1:] &= ~in_basin[:, :-1]
+    run_ids = np.cumsum(run_start.ravel(), dtype=np.int64).reshape(in_basin.shape) - 1
+    n_run = int(run_ids[-1, -1]) + 1 if in_basin.size > 0 else 0
+
+    # One edge per vertical overlap is enough, so keep only the first column
+    # of every stretch where two rows are both in a basin
+    touching = in_basin[:-1, :] & in_basin[1:, :]
+    touching[:, 1:] &= ~touching[:, :-1]
+    (i, j) = np.nonzero(touching)
+    parent = union_edges(np.arange(n_run), run_ids[i, j], run_ids[i + 1, j])
+
+    # Relabel the roots 0, 1, 2, ... in order of appearance
+    (_, basin_of_run) = np.unique(parent, return_inverse=True)
+    labels = np.full(in_basin.shape, -1, dtype=np.int64)
+    labels[in_basin] = basin_of_run[run_ids[in_basin]]
+    return labels
+
+
+def _close_basins(largest: List[int], sizes: np.ndarray) -> List[int]:
+    # Folds the sizes of basins that can no longer grow into the running
+    # list of the largest ones
+    if len(sizes) > N_LARGEST:
+        sizes = np.partition(sizes, -N_LARGEST)[-N_LARGEST:]
+    return heapq.nlargest(N_LARGEST, largest + sizes.tolist())
+
+
+def scan_bands(fpath: str, band_rows: int = 1024) -> MapSummary:
+    # Streams a memory-mapped height map in bands of 'band_rows' rows. Apart
+    # from the current band, only the basins that reach the last row so far
+    # (at most one per column) are kept; a basin that doesn't reach it can't
+    # grow any more, so its size goes into the running largest few
+    ascii_grid = map_digit_grid(fpath)
+    (n_row, n_col) = ascii_grid.shape
+    pad_value = np.iinfo(np.uint8).max
+
+    (risk, largest) = (0, [])
+    # Basin of every cell of the last row so far (-1 for 9s) and its size
+    open_labels = np.full((n_col,), -1, dtype=np.int64)
+    open_sizes = np.zeros((0,), dtype=np.int64)
+    for start in range(0, n_row, band_rows):
+        end = min(start + band_rows, n_row)
+
+        # The band plus the row either side of it, where there is one
+        (halo_start, halo_end) = (max(start - 1, 0), min(end + 1, n_row))
+        padded = np.full((end - start + 2, n_col + 2), pad_value, dtype=np.uint8)
+        offset = 1 - (start - halo_start)
+        padded[offset:offset + (halo_end - halo_start), 1:-1] = (
+            ascii_grid[halo_start:halo_end] - np.uint8(ZERO))
+        band = padded[1:-1, 1:-1]
+        if np.any(band > 9):
+            raise ValueError(f"ERROR: Non-digit character in grid file {fpath}")
+        is_low_point = low_points(padded)
+        risk += int(np.sum(band[is_low_point], dtype=np.int64)) + int(np.count_nonzero(is_low_point))
+
+        # Label the band after the open basins, then join the basins that
+        # carry on over the boundary; one edge per stretch of touching
+        # cells is enough, as each stretch is within one basin either side
+        n_open = len(open_sizes)
+        labels = label_basins(band < 9)
+        in_basin = (labels >= 0)
+        labels[in_basin] += n_open
+        sizes = np.concatenate((open_sizes, np.bincount(labels[in_basin] - n_open)))
+        touching = (open_labels >= 0) & in_basin[0]
+        touching[1:] &= ~touching[:-1]
+        parent = union_edges(np.arange(len(sizes)), open_labels[touching], labels[0, touching])
+        sizes = np.bincount(parent, weights=sizes, minlength=len(sizes)).astype(np.int64)
+
+        # Basins still open are the ones that reach the band's last row
+        at_end = in_basin[-1]
+        end_roots = parent[labels[-1, at_end]]
+        is_open = np.zeros((len(sizes),), dtype=bool)
+        is_open[end_roots] = True
+        is_root = (parent == np.arange(len(sizes)))
+        largest = _close_basins(largest, sizes[is_root & ~is_open])
+
+        open_labels = np.full((n_col,), -1, dtype=np.int64)
+        open_labels[at_end] = (np.cumsum(is_open) - 1)[end_roots]
+        open_sizes = sizes[is_open]
+
+    largest = _close_basins(largest, open_sizes)
+    return MapSummary(risk, np.array(largest, dtype=np.int64))
+
+
+def solve_pt1(data: np.ndarray) -> int:
     hmap = HeightMap(data)
     return hmap.risk_level()
 
 
-def solve_pt2(data: List[str]) -> int:
+def solve_pt2(data: np.ndarray) -> int:
     hmap = HeightMap(data)
     return hmap.get_largest_basin_size()
 
 
-def load_data(fpath: str) -> List[List[int]]:
-    data = None
-    with open(fpath, "r") as f:
-        data = f.read().splitlines()
-    grid = [list(map(int, list(row))) for row in data]
-    return grid
+def load_data(fpath: str) -> np.ndarray:
+    return load_digit_grid(fpath)
 
 
 def main():
-    example_data = load_data(EXAMPLE_DATA_PATH)
+    with measure("load"):
+        example_data = load_data(EXAMPLE_DATA_PATH)
     (example_answer1, example_answer2) = (15, 1134)
-    print(f"Answer to Part 1: {solve_pt1(example_data)}")
-    print(f"Answer to Part 2: {solve_pt2(example_data)}")
-    assert solve_pt1(example_data) == example_answer1
-    assert solve_pt2(example_data) == example_answer2
-
-    test_data = load_data(TEST_DATA_PATH)
+    with measure("part1"):
+        answer1 = solve_pt1(example_data)
+    with measure("part2"):
+        answer2 = solve_pt2(example_data)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
+    assert answer1 == example_answer1
+    assert answer2 == example_answer2
+
+    summary = scan_bands(EXAMPLE_DATA_PATH, band_rows=2)
+    assert summary.risk_level == example_answer1
+    assert summary.get_largest_basin_size() == example_answer2
+
+    with measure("load"):
+        test_data = load_data(TEST_DATA_PATH)
     print(f"Number of entries in data: {len(test_data)}")
-    print(f"Answer to Part 1: {solve_pt1(test_data)}")
-    print(f"Answer to Part 2: {solve_pt2(test_data)}")
+    with measure("part1"):
+        answer1 = solve_pt1(test_data)
+    with measure("part2"):
+        answer2 = solve_pt2(test_data)
+    print(f"Answer to Part 1: {answer1}")
+    print(f"Answer to Part 2: {answer2}")
 
 
 if __name__ == "__main__":